@@ -0,0 +1,465 @@
+"""Кэш на общем SQLite-файле в WAL-режиме.
+
+В отличие от LocMemCache его видят все процессы-воркеры на машине:
+инвалидация в одном процессе сразу действует в остальных. Целые числа
+хранятся как INTEGER, поэтому incr атомарен на уровне SQLite, остальные
+значения сериализуются pickle. Истёкшие записи удаляются при чтении и
+при чистке, при переполнении вытесняются давно не читавшиеся (LRU).
+
+TwoTierCache ставит перед таким общим кэшем небольшой LRU в памяти
+процесса: горячие ключи читаются без обращения к файлу, а изменения
+рассылаются остальным процессам через таблицу инвалидаций.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.utils.functional import cached_property
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entries ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL,'
+    ' expires REAL, accessed REAL NOT NULL) WITHOUT ROWID',
+    'CREATE INDEX IF NOT EXISTS cache_entries_accessed'
+    ' ON cache_entries (accessed)',
+)
+# Время последнего чтения обновляется не чаще раза в секунду,
+# чтобы горячие ключи не превращали каждый get в запись.
+ACCESS_RESOLUTION = 1.0
+CULL_EVERY = 100
+BUSY_TIMEOUT_MS = 5000
+
+
+class LocalConnection:
+    """Соединение с SQLite-файлом, своё у каждого потока и процесса."""
+
+    def __init__(self, path, schema):
+        self.path = path
+        self.schema = schema
+        self.local = threading.local()
+
+    def get(self):
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(
+                self.path, timeout=BUSY_TIMEOUT_MS / 1000,
+                isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            for statement in self.schema:
+                connection.execute(statement)
+            self.local.connection = connection
+            self.local.pid = os.getpid()
+        return connection
+
+
+class SQLiteCache(BaseCache):
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._connection = LocalConnection(location, SCHEMA)
+        self._sets = 0
+
+    @property
+    def _db(self):
+        return self._connection.get()
+
+    def _encode(self, value):
+        if type(value) is int:
+            return value
+        return pickle.dumps(value, self.pickle_protocol)
+
+    @staticmethod
+    def _decode(value):
+        if isinstance(value, int):
+            return value
+        return pickle.loads(value)
+
+    def _key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def _read(self, keys):
+        """Живые записи {key: (value, expires)} с обновлением доступа."""
+        now = time.time()
+        found = {}
+        stale = []
+        for start in range(0, len(keys), 500):
+            chunk = keys[start:start + 500]
+            rows = self._db.execute(
+                'SELECT key, value, expires, accessed FROM cache_entries'
+                f' WHERE key IN ({", ".join("?" * len(chunk))})', chunk)
+            for key, value, expires, accessed in rows:
+                if expires is not None and expires <= now:
+                    continue
+                found[key] = (value, expires)
+                if accessed < now - ACCESS_RESOLUTION:
+                    stale.append((now, key))
+        if stale:
+            self._db.executemany(
+                'UPDATE cache_entries SET accessed = ? WHERE key = ?', stale)
+        return found
+
+    def _write(self, rows, timeout, replace=True):
+        expires = self.get_backend_timeout(timeout)
+        now = time.time()
+        verb = 'INSERT OR REPLACE' if replace else 'INSERT'
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            if not replace:
+                # add() может занять место только истёкшей записи.
+                db.executemany(
+                    'DELETE FROM cache_entries WHERE key = ?'
+                    ' AND expires <= ?', [(key, now) for key, _ in rows])
+            cursor = db.executemany(
+                f'{verb} INTO cache_entries (key, value, expires, accessed)'
+                ' VALUES (?, ?, ?, ?)',
+                [(key, self._encode(value), expires, now)
+                 for key, value in rows])
+            db.execute('COMMIT')
+        except sqlite3.IntegrityError:
+            db.execute('ROLLBACK')
+            return False
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        self._sets += len(rows)
+        if self._sets >= CULL_EVERY:
+            self._sets = 0
+            self._cull()
+        return cursor.rowcount > 0
+
+    def _cull(self):
+        db = self._db
+        db.execute('DELETE FROM cache_entries WHERE expires <= ?',
+                   (time.time(),))
+        count, = db.execute('SELECT COUNT(*) FROM cache_entries').fetchone()
+        if count <= self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            db.execute('DELETE FROM cache_entries')
+            return
+        db.execute(
+            'DELETE FROM cache_entries WHERE key IN (SELECT key'
+            ' FROM cache_entries ORDER BY accessed LIMIT ?)',
+            (count // self._cull_frequency,))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        return self._write([(key, value)], timeout, replace=False)
+
+    def get(self, key, default=None, version=None):
+        key = self._key(key, version)
+        found = self._read([key])
+        if key not in found:
+            return default
+        return self._decode(found[key][0])
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._write([(self._key(key, version), value)], timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self._key(key, version)
+        cursor = self._db.execute(
+            'UPDATE cache_entries SET expires = ? WHERE key = ?'
+            ' AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()))
+        return cursor.rowcount > 0
+
+    def delete(self, key, version=None):
+        self._db.execute('DELETE FROM cache_entries WHERE key = ?',
+                         (self._key(key, version),))
+
+    def get_many(self, keys, version=None):
+        return {key: value for key, (value, _) in self.get_many_expiring(
+            keys, version).items()}
+
+    def get_many_expiring(self, keys, version=None):
+        """{key: (value, expires)}, expires — срок по time.time() или None."""
+        keys = {self._key(key, version): key for key in keys}
+        found = self._read(list(keys))
+        return {keys[key]: (self._decode(value), expires)
+                for key, (value, expires) in found.items()}
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        rows = [(self._key(key, version), value)
+                for key, value in data.items()]
+        if rows:
+            self._write(rows, timeout)
+        return []
+
+    def delete_many(self, keys, version=None):
+        self._db.executemany(
+            'DELETE FROM cache_entries WHERE key = ?',
+            [(self._key(key, version),) for key in keys])
+
+    def has_key(self, key, version=None):
+        key = self._key(key, version)
+        return key in self._read([key])
+
+    def incr(self, key, delta=1, version=None):
+        key = self._key(key, version)
+        db = self._db
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            row = db.execute(
+                'SELECT value FROM cache_entries WHERE key = ?'
+                ' AND (expires IS NULL OR expires > ?)',
+                (key, time.time())).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = self._decode(row[0]) + delta
+            db.execute('UPDATE cache_entries SET value = ? WHERE key = ?',
+                       (self._encode(value), key))
+            db.execute('COMMIT')
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        return value
+
+    def clear(self):
+        self._db.execute('DELETE FROM cache_entries')
+
+    def close(self, **kwargs):
+        # Соединение живёт весь поток: закрывать его после каждого
+        # запроса значило бы заново открывать файл и проверять схему.
+        pass
+
+
+CHANNEL_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_invalidations ('
+    ' seq INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' key TEXT NOT NULL, pid INTEGER NOT NULL)',
+)
+FLUSH_ALL = '*'
+CHANNEL_RETENTION = 10_000
+# Как часто процесс заглядывает в канал инвалидаций, в секундах.
+SYNC_INTERVAL = 0.05
+
+_l1_stores = {}
+_l1_lock = threading.Lock()
+
+
+class L1Store:
+    """Ограниченный LRU одного процесса, общий для всех его потоков."""
+
+    def __init__(self, max_entries, timeout):
+        self.max_entries = max_entries
+        self.timeout = timeout
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.pid = os.getpid()
+        self.last_seq = None
+        self.synced = 0.0
+        self.stats = Counter()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return entry[0]
+
+    def put(self, key, pickled, expires=None):
+        """expires — срок записи в L2 по time.time(): копия не живёт дольше."""
+        ttl = self.timeout
+        if expires is not None:
+            ttl = min(ttl, expires - time.time())
+        with self.lock:
+            self.entries[key] = (pickled, time.monotonic() + ttl)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def evict(self, keys):
+        with self.lock:
+            for key in keys:
+                self.entries.pop(key, None)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class TwoTierCache(BaseCache):
+    """L1 LRU в памяти процесса перед общим кэшем L2.
+
+    LOCATION — алиас L2 в settings.CACHES. Изменения ключей пишутся в
+    канал (таблицу в SQLite-файле OPTIONS['CHANNEL']), а каждый процесс
+    не реже раза в SYNC_INTERVAL вычитывает его и выбрасывает из своего
+    L1 изменённые другими процессами ключи. L1_TIMEOUT ограничивает
+    жизнь локальной копии, если канал недоступен; копия ключа с
+    коротким сроком в L2 живёт не дольше него. L2 — SQLiteCache.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        options = params.get('OPTIONS', {})
+        self._l2_alias = location
+        self._channel = LocalConnection(options['CHANNEL'], CHANNEL_SCHEMA)
+        super().__init__(params)
+        with _l1_lock:
+            if os.getpid() != getattr(_l1_stores.get(location), 'pid', None):
+                _l1_stores[location] = L1Store(
+                    options.get('L1_MAX_ENTRIES', 1000),
+                    options.get('L1_TIMEOUT', 5))
+            self._l1 = _l1_stores[location]
+
+    @cached_property
+    def _l2(self):
+        from django.core.cache import caches
+        return caches[self._l2_alias]
+
+    @property
+    def stats(self):
+        return self._l1.stats
+
+    def hit_ratios(self):
+        """Доля запросов, закрытых L1, L2, и доля промахов."""
+        stats = self._l1.stats
+        total = stats['l1'] + stats['l2'] + stats['miss']
+        return {tier: stats[tier] / total if total else 0.0
+                for tier in ('l1', 'l2', 'miss')}
+
+    def _sync(self):
+        l1 = self._l1
+        now = time.monotonic()
+        if now - l1.synced < SYNC_INTERVAL:
+            return
+        l1.synced = now
+        db = self._channel.get()
+        if l1.last_seq is None:
+            l1.last_seq, = db.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM cache_invalidations'
+            ).fetchone()
+            return
+        # Один снимок канала: запись между запросами не потеряется.
+        db.execute('BEGIN')
+        try:
+            oldest, = db.execute(
+                'SELECT MIN(seq) FROM cache_invalidations').fetchone()
+            rows = db.execute(
+                'SELECT seq, key, pid FROM cache_invalidations'
+                ' WHERE seq > ? ORDER BY seq', (l1.last_seq,)).fetchall()
+        finally:
+            db.execute('COMMIT')
+        keys = [key for _, key, pid in rows if pid != l1.pid]
+        if FLUSH_ALL in keys or (oldest or 0) > l1.last_seq + 1:
+            # Событие очистки или пропущенная часть канала.
+            l1.clear()
+        else:
+            l1.evict(keys)
+        if rows:
+            l1.last_seq = rows[-1][0]
+
+    def _broadcast(self, keys):
+        self._l1.evict(keys)
+        db = self._channel.get()
+        db.execute('BEGIN IMMEDIATE')
+        try:
+            for key in keys:
+                last = db.execute(
+                    'INSERT INTO cache_invalidations (key, pid)'
+                    ' VALUES (?, ?)', (key, self._l1.pid)).lastrowid
+            if last % CHANNEL_RETENTION < len(keys):
+                db.execute(
+                    'DELETE FROM cache_invalidations WHERE seq <= ?',
+                    (last - CHANNEL_RETENTION,))
+        except BaseException:
+            db.execute('ROLLBACK')
+            raise
+        db.execute('COMMIT')
+
+    def _l1_key(self, key, version):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return key
+
+    def get(self, key, default=None, version=None):
+        return self.get_many([key], version=version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        self._sync()
+        keys = list(keys)
+        found = {}
+        missing = []
+        for key in keys:
+            pickled = self._l1.get(self._l1_key(key, version))
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        self._l1.stats['l1'] += len(found)
+        if missing:
+            fetched = {}
+            for key, (value, expires) in self._l2.get_many_expiring(
+                    missing, version=version).items():
+                self._l1.put(self._l1_key(key, version),
+                             pickle.dumps(value, self.pickle_protocol),
+                             expires)
+                fetched[key] = value
+            found.update(fetched)
+            self._l1.stats['l2'] += len(fetched)
+            self._l1.stats['miss'] += len(missing) - len(fetched)
+        return found
+
+    def has_key(self, key, version=None):
+        return key in self.get_many([key], version=version)
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self._l2.add(key, value, self._timeout(timeout), version)
+        if added:
+            self._broadcast([self._l1_key(key, version)])
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.set_many({key: value}, timeout, version)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self._l2.set_many(data, self._timeout(timeout), version)
+        if data:
+            self._broadcast([self._l1_key(key, version) for key in data])
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self._l2.touch(key, self._timeout(timeout), version)
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version)
+
+    def delete_many(self, keys, version=None):
+        keys = list(keys)
+        if not keys:
+            return
+        self._l2.delete_many(keys, version)
+        self._broadcast([self._l1_key(key, version) for key in keys])
+
+    def incr(self, key, delta=1, version=None):
+        try:
+            value = self._l2.incr(key, delta, version)
+        except ValueError:
+            # Ключа в L2 нет: менять было нечего, рассылать тоже.
+            self._l1.evict([self._l1_key(key, version)])
+            raise
+        self._broadcast([self._l1_key(key, version)])
+        return value
+
+    def clear(self):
+        self._l2.clear()
+        self._l1.clear()
+        self._broadcast([FLUSH_ALL])
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
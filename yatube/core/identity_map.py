@@ -0,0 +1,88 @@
+"""Карта идентичности на время запроса: один экземпляр модели на pk.
+
+Связанные объекты (автор, группа поста) подгружаются одним in_bulk на
+модель или строятся из JOIN (posts.read_models) и переиспользуются
+всеми querysets запроса. stats показывает, сколько объектов загружено
+и сколько загрузок удалось не делать. Вне запроса current() отдаёт
+пустую одноразовую карту.
+"""
+import contextvars
+from collections import Counter
+
+_current = contextvars.ContextVar('identity_map', default=None)
+
+
+class IdentityMap:
+    def __init__(self):
+        self.instances = {}
+        self.stats = Counter()
+
+    def add(self, obj):
+        """Регистрирует obj и возвращает экземпляр, уже бывший в карте."""
+        return self.instances.setdefault((type(obj), obj.pk), obj)
+
+    def get_or_build(self, kind, pk, build):
+        """Общий на запрос объект kind с этим pk, build() — если его нет."""
+        obj = self.instances.get((kind, pk))
+        if obj is None:
+            obj = self.instances[kind, pk] = build()
+            self.stats['loaded'] += 1
+        else:
+            self.stats['avoided'] += 1
+        return obj
+
+    def get_many(self, model, pks):
+        """{pk: объект} — из карты, недостающие одним запросом."""
+        missing = [pk for pk in pks if (model, pk) not in self.instances]
+        if missing:
+            loaded = model._default_manager.in_bulk(missing)
+            self.stats['loaded'] += len(loaded)
+            for obj in loaded.values():
+                self.add(obj)
+        return {pk: self.instances[model, pk] for pk in pks
+                if (model, pk) in self.instances}
+
+    def attach(self, objs, *fields):
+        """Проставляет objs связанные по ForeignKey fields объекты."""
+        objs = list(objs)
+        if not objs:
+            return objs
+        for name in fields:
+            field = objs[0]._meta.get_field(name)
+            pending = []
+            for obj in objs:
+                if getattr(obj, field.attname) is None:
+                    continue
+                if not field.is_cached(obj):
+                    pending.append(obj)
+                elif field.get_cached_value(obj) is not None:
+                    field.set_cached_value(
+                        obj, self.add(field.get_cached_value(obj)))
+            loaded = self.stats['loaded']
+            related = self.get_many(
+                field.related_model,
+                {getattr(obj, field.attname) for obj in pending})
+            for obj in pending:
+                field.set_cached_value(
+                    obj, related.get(getattr(obj, field.attname)))
+            self.stats['avoided'] += (
+                len(pending) - (self.stats['loaded'] - loaded))
+        return objs
+
+    def report(self):
+        return (f'avoided={self.stats["avoided"]} '
+                f'loaded={self.stats["loaded"]} '
+                f'instances={len(self.instances)}')
+
+
+def current():
+    identity_map = _current.get()
+    return IdentityMap() if identity_map is None else identity_map
+
+
+def activate():
+    return _current.set(IdentityMap())
+
+
+def deactivate(token):
+    _current.reset(token)
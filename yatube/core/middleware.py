@@ -0,0 +1,176 @@
+import copy
+import threading
+import time
+from collections import deque
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from . import identity_map, single_flight
+from .page_cache import (PAGE_CACHE_TIMEOUT, STALE_PAGE_TIMEOUT,
+                         conditional_page, fill_holes, generation, page_key,
+                         stale_page_key)
+
+CACHED_VIEWS = {
+    'posts:index',
+    'posts:group_list',
+    'posts:profile',
+    'posts:post_detail',
+}
+CACHED_PARAMS = {'page', 'after', 'before'}
+# Порог перегрузки процесса: одновременных запросов к представлениям
+# или средняя задержка за последние LATENCY_WINDOW секунд.
+MAX_IN_FLIGHT = 8
+MAX_LATENCY = 1.0
+LATENCY_WINDOW = 10
+REFRESH_TIMEOUT = 30
+
+
+class PageCacheMiddleware:
+    """Кэширует страницы ленты для GET-запросов с заполнением дыр.
+
+    В кэш пишут только анонимные запросы, читают его все: персональные
+    части страницы дорисовываются через core.page_cache.fill_holes.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not self.is_cacheable(request):
+            return self.get_response(request)
+        key = page_key(request)
+        body = cache.get(key)
+        if body is not None:
+            return conditional_page(self.cached_response)(request, body)
+        store = not request.user.is_authenticated
+        request.punch_holes = store
+        response = self.get_response(request)
+        if store and response.status_code == 200 and not response.streaming:
+            body = response.content.decode(response.charset)
+            cache.set(key, body, PAGE_CACHE_TIMEOUT)
+            cache.set(stale_page_key(request), (generation(), body),
+                      STALE_PAGE_TIMEOUT)
+            response.content = fill_holes(request, body)
+            response['X-Page-Cache'] = 'miss'
+        return response
+
+    @staticmethod
+    def cached_response(request, body):
+        response = HttpResponse(fill_holes(request, body))
+        response['X-Page-Cache'] = 'hit'
+        return response
+
+    @staticmethod
+    def is_cacheable(request):
+        if request.method not in ('GET', 'HEAD'):
+            return False
+        if not CACHED_PARAMS.issuperset(request.GET):
+            return False
+        try:
+            match = resolve(request.path_info)
+        except Resolver404:
+            return False
+        if match.view_name not in CACHED_VIEWS:
+            return False
+        request.resolver_match = match
+        return True
+
+
+class IdentityMapMiddleware:
+    """Карта идентичности на каждый запрос, в DEBUG — её отчёт."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        token = identity_map.activate()
+        try:
+            response = self.get_response(request)
+            if settings.DEBUG:
+                response['X-Identity-Map'] = identity_map.current().report()
+            return response
+        finally:
+            identity_map.deactivate(token)
+
+
+class LoadSheddingMiddleware:
+    """При перегрузке отдаёт анонимам последнюю отрисовку страницы.
+
+    Считает запросы в работе и задержку ответов процесса. Пока они выше
+    порогов, кэшируемые страницы для анонимов берутся из последней
+    сохранённой PageCacheMiddleware копии, даже устаревшей, и помечаются
+    X-Page-Cache: stale; свежая версия рендерится в фоновом потоке.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.lock = threading.Lock()
+        self.in_flight = 0
+        self.latencies = deque()
+        # Сумма задержек в latencies: среднее без обхода окна.
+        self.total_latency = 0.0
+
+    def __call__(self, request):
+        if (self.overloaded() and not request.user.is_authenticated
+                and PageCacheMiddleware.is_cacheable(request)):
+            response = self.last_rendering(request)
+            if response is not None:
+                return response
+        return self.timed_response(request)
+
+    def timed_response(self, request):
+        with self.lock:
+            self.in_flight += 1
+        started = time.monotonic()
+        try:
+            return self.get_response(request)
+        finally:
+            finished = time.monotonic()
+            with self.lock:
+                self.in_flight -= 1
+                self.latencies.append((finished, finished - started))
+                self.total_latency += finished - started
+
+    def overloaded(self):
+        with self.lock:
+            horizon = time.monotonic() - LATENCY_WINDOW
+            while self.latencies and self.latencies[0][0] < horizon:
+                self.total_latency -= self.latencies.popleft()[1]
+            if self.in_flight >= MAX_IN_FLIGHT:
+                return True
+            if not self.latencies:
+                # Сбрасываем накопленную ошибку округления.
+                self.total_latency = 0.0
+                return False
+            return self.total_latency / len(self.latencies) > MAX_LATENCY
+
+    def last_rendering(self, request):
+        key = stale_page_key(request)
+        stored = cache.get(key)
+        if stored is None:
+            return None
+        page_generation, body = stored
+        response = HttpResponse(fill_holes(request, body))
+        if page_generation == generation():
+            response['X-Page-Cache'] = 'hit'
+            return response
+        response['X-Page-Cache'] = 'stale'
+        if cache.add(single_flight.lock_key(key), 1, REFRESH_TIMEOUT):
+            self.start_refresh(request, key)
+        return response
+
+    def start_refresh(self, request, key):
+        threading.Thread(target=self.refresh, args=(copy.copy(request), key),
+                         daemon=True).start()
+
+    def refresh(self, request, key):
+        """Рендерит страницу заново: PageCacheMiddleware сохранит её."""
+        try:
+            self.timed_response(request)
+        finally:
+            cache.delete(single_flight.lock_key(key))
+            connection.close()
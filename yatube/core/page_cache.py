@@ -0,0 +1,105 @@
+"""Полностраничный кэш с «дырами» под персональные фрагменты.
+
+Страница кэшируется с маркерами на месте пользовательских фрагментов
+(шапка, форма комментария, кнопка подписки). При отдаче маркеры
+заполняются для текущего запроса, поэтому одно закэшированное тело
+подходит и анонимам, и авторизованным пользователям.
+"""
+import base64
+import hashlib
+import json
+import re
+import time
+from datetime import datetime, timezone
+
+from django.core.cache import cache
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils.html import escape
+from django.views.decorators.http import condition
+
+PAGE_CACHE_TIMEOUT = 60 * 10
+STALE_PAGE_TIMEOUT = 60 * 60 * 24
+GENERATION_KEY = 'page_cache:generation'
+MODIFIED_KEY = 'page_cache:modified'
+HOLE_RE = re.compile(r'<!--hole:(?P<name>[\w.]+):(?P<kwargs>[\w=-]*)-->')
+
+holes = {}
+
+
+def hole(name):
+    """Регистрирует функцию (request, **kwargs) -> str для дыры name."""
+    def decorator(func):
+        holes[name] = func
+        return func
+    return decorator
+
+
+@hole('header')
+def header(request):
+    return render_to_string('includes/header.html', request=request)
+
+
+@hole('request_path')
+def request_path(request):
+    return escape(request.path)
+
+
+def hole_marker(name, kwargs):
+    packed = base64.urlsafe_b64encode(json.dumps(kwargs).encode()).decode()
+    return f'<!--hole:{name}:{packed}-->'
+
+
+def fill_holes(request, content):
+    def render_hole(match):
+        kwargs = json.loads(base64.urlsafe_b64decode(match['kwargs']))
+        return holes[match['name']](request, **kwargs)
+    return HOLE_RE.sub(render_hole, content)
+
+
+def generation():
+    value = cache.get(GENERATION_KEY)
+    if value is None:
+        cache.add(GENERATION_KEY, time.time_ns(), None)
+        value = cache.get(GENERATION_KEY)
+    return value
+
+
+def purge_pages():
+    """Сбрасывает все закэшированные страницы сменой поколения."""
+    def bump():
+        try:
+            cache.incr(GENERATION_KEY)
+        except ValueError:
+            pass
+        cache.set(MODIFIED_KEY, time.time(), None)
+    bump()
+    # Страница, отрисованная до коммита, попала в новое поколение.
+    transaction.on_commit(bump)
+
+
+def page_etag(request, *args, **kwargs):
+    """Валидатор страницы без запросов к БД: поколение кэша и юзер."""
+    raw = f'{generation()}:{request.user.pk}:{request.get_full_path()}'
+    return hashlib.md5(raw.encode()).hexdigest()
+
+
+def page_last_modified(request, *args, **kwargs):
+    modified = cache.get(MODIFIED_KEY)
+    if modified is None:
+        modified = time.time()
+        cache.add(MODIFIED_KEY, modified, None)
+    return datetime.fromtimestamp(modified, timezone.utc)
+
+
+conditional_page = condition(etag_func=page_etag,
+                             last_modified_func=page_last_modified)
+
+
+def page_key(request):
+    return f'page:{generation()}:{request.get_full_path()}'
+
+
+def stale_page_key(request):
+    """Последняя отрисованная версия страницы независимо от поколения."""
+    return f'page_stale:{request.get_full_path()}'
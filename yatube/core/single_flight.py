@@ -0,0 +1,97 @@
+"""Защита от одновременного пересчёта одного ключа кэша (single-flight).
+
+При промахе значение считает только запрос, взявший блокировку через
+cache.add. Остальные отдают устаревшую копию (stale_key), а если её
+нет, ждут результат до WAIT_TIMEOUT. Горячие ключи пересчитываются
+заранее с вероятностью, растущей к концу TTL и пропорциональной времени
+прошлого пересчёта (XFetch), поэтому обычно не истекают вовсе.
+"""
+import math
+import random
+import time
+from collections import Counter
+
+from django.core.cache import cache
+
+LOCK_TIMEOUT = 30
+WAIT_TIMEOUT = 2.0
+POLL_INTERVAL = 0.05
+BETA = 1.0
+
+stats = Counter()
+_missing = object()
+
+
+def lock_key(key):
+    return f'{key}:lock'
+
+
+def meta_key(key):
+    return f'{key}:meta'
+
+
+def recompute_early(meta, beta=BETA, now=None):
+    """Решение XFetch: пора ли пересчитать ещё живое значение."""
+    if meta is None or beta <= 0:
+        return False
+    delta, expires = meta
+    if expires is None:
+        return False
+    now = time.time() if now is None else now
+    return now - delta * beta * math.log(1 - random.random()) >= expires
+
+
+def _compute(key, compute, timeout, stale_key, locked):
+    started = time.monotonic()
+    try:
+        value = compute()
+        delta = time.monotonic() - started
+        if callable(timeout):
+            timeout = timeout(value)
+        expires = None if timeout is None else time.time() + timeout
+        cache.set_many({key: value, meta_key(key): (delta, expires)},
+                       timeout)
+        if stale_key is not None:
+            cache.set(stale_key, value, timeout)
+    finally:
+        if locked:
+            cache.delete(lock_key(key))
+    stats['computed'] += 1
+    return value
+
+
+def get_or_set(key, compute, timeout, stale_key=None, beta=BETA):
+    """cache.get_or_set, при котором compute() на ключ идёт один раз.
+
+    timeout может быть функцией от посчитанного значения. stale_key —
+    ключ последнего значения, которое можно отдать, пока другой запрос
+    считает новое (например, фрагмент предыдущей версии ленты).
+    """
+    values = cache.get_many([key, meta_key(key)])
+    value = values.get(key, _missing)
+    if value is not _missing:
+        if not recompute_early(values.get(meta_key(key)), beta):
+            stats['hit'] += 1
+            return value
+        if not cache.add(lock_key(key), 1, LOCK_TIMEOUT):
+            stats['hit'] += 1
+            return value
+        stats['early'] += 1
+        return _compute(key, compute, timeout, stale_key, locked=True)
+    if cache.add(lock_key(key), 1, LOCK_TIMEOUT):
+        return _compute(key, compute, timeout, stale_key, locked=True)
+    if stale_key is not None:
+        value = cache.get(stale_key, _missing)
+        if value is not _missing:
+            stats['stale'] += 1
+            return value
+    deadline = time.monotonic() + WAIT_TIMEOUT
+    while time.monotonic() < deadline:
+        time.sleep(POLL_INTERVAL)
+        value = cache.get(key, _missing)
+        if value is not _missing:
+            stats['waited'] += 1
+            return value
+    # Держатель блокировки не успел: считаем сами, не дожидаясь его.
+    stats['gave_up'] += 1
+    return _compute(key, compute, timeout, stale_key, locked=False)
@@ -0,0 +1,52 @@
+from django import template
+from django.core.cache.utils import make_template_fragment_key
+from django.templatetags.cache import CacheNode
+
+from .. import single_flight
+
+register = template.Library()
+
+
+class SingleFlightCacheNode(CacheNode):
+    def __init__(self, nodelist, expire_time_var, fragment_name, vary_on,
+                 stale_on):
+        super().__init__(nodelist, expire_time_var, fragment_name, vary_on,
+                         None)
+        self.stale_on = stale_on
+
+    def render(self, context):
+        expire_time = self.expire_time_var.resolve(context)
+        if expire_time is not None:
+            expire_time = int(expire_time)
+        vary_on = [var.resolve(context) for var in self.vary_on]
+        stale_key = None
+        if self.stale_on is not None:
+            stale_on = [self.stale_on.resolve(context)]
+            stale_key = make_template_fragment_key(
+                f'{self.fragment_name}:stale', stale_on)
+        return single_flight.get_or_set(
+            make_template_fragment_key(self.fragment_name, vary_on),
+            lambda: self.nodelist.render(context), expire_time, stale_key)
+
+
+@register.tag('cache_fragment')
+def do_cache_fragment(parser, token):
+    """{% cache %} с пересчётом фрагмента одним запросом.
+
+    {% cache_fragment timeout name [vary_on ...] [stale=key] %}: пока
+    один запрос рендерит фрагмент, остальные получают последнюю версию,
+    сохранённую под stale-ключом, или ждут его.
+    """
+    nodelist = parser.parse(('endcache_fragment',))
+    parser.delete_first_token()
+    tokens = token.split_contents()
+    if len(tokens) < 3:
+        raise template.TemplateSyntaxError(
+            f'{tokens[0]!r} tag requires at least 2 arguments.')
+    stale_on = None
+    if len(tokens) > 3 and tokens[-1].startswith('stale='):
+        stale_on = parser.compile_filter(tokens[-1][len('stale='):])
+        tokens = tokens[:-1]
+    return SingleFlightCacheNode(
+        nodelist, parser.compile_filter(tokens[1]), tokens[2],
+        [parser.compile_filter(token) for token in tokens[3:]], stale_on)
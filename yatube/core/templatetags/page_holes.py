@@ -0,0 +1,15 @@
+from django import template
+from django.utils.safestring import mark_safe
+
+from ..page_cache import hole_marker, holes
+
+register = template.Library()
+
+
+@register.simple_tag(takes_context=True)
+def hole(context, name, **kwargs):
+    """Персональный фрагмент: маркер для кэша страницы или сам фрагмент."""
+    request = context['request']
+    if getattr(request, 'punch_holes', False):
+        return mark_safe(hole_marker(name, kwargs))
+    return mark_safe(holes[name](request, **kwargs))
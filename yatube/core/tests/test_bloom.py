@@ -0,0 +1,15 @@
+from django.test import SimpleTestCase
+
+from core.bloom import BloomFilter
+
+
+class BloomFilterTest(SimpleTestCase):
+    def test_membership(self):
+        """Добавленное всегда найдено, ложных срабатываний мало."""
+        bloom = BloomFilter(1000)
+        for i in range(1000):
+            bloom.add(f'user{i}')
+        self.assertTrue(all(f'user{i}' in bloom for i in range(1000)))
+        false_positives = sum(f'other{i}' in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+        self.assertFalse(bloom.full)
@@ -0,0 +1,194 @@
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.test import SimpleTestCase
+
+from core import cache_backends
+from core.cache_backends import SQLiteCache, TwoTierCache
+from yatube.settings import source_release
+
+
+def two_tier(location):
+    cache = TwoTierCache(location, {'OPTIONS': {'CHANNEL': location}})
+    cache._l2 = SQLiteCache(location, {})
+    return cache
+
+
+def set_in_other_process(location, key, value):
+    two_tier(location).set(key, value)
+
+
+def incr_many(location, times):
+    cache = SQLiteCache(location, {})
+    for _ in range(times):
+        cache.incr('counter')
+
+
+class SQLiteCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = SQLiteCache(self.location, {})
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_values_round_trip(self):
+        """Значения любых типов читаются так же, как записаны."""
+        values = {'int': 5, 'bool': True, 'str': 'строка',
+                  'dict': {'a': [1, 2]}, 'none': None}
+        self.cache.set_many(values)
+        self.assertEqual(self.cache.get_many(list(values)), values)
+        self.assertIs(self.cache.get('bool'), True)
+        self.cache.delete_many(['int', 'str'])
+        self.assertEqual(self.cache.get('int', 'нет'), 'нет')
+
+    def test_timeout_and_add(self):
+        """Истёкшие ключи не читаются и освобождают место для add."""
+        self.cache.set('key', 'old', timeout=0.05)
+        self.assertFalse(self.cache.add('key', 'new'))
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('key'))
+        self.assertTrue(self.cache.add('key', 'new'))
+        self.assertEqual(self.cache.get('key'), 'new')
+        self.assertTrue(self.cache.touch('key', None))
+
+    def test_incr_is_shared_between_processes(self):
+        """incr из нескольких процессов не теряет обновлений."""
+        self.cache.set('counter', 0)
+        workers = [multiprocessing.Process(target=incr_many,
+                                           args=(self.location, 100))
+                   for _ in range(4)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        self.assertEqual(self.cache.get('counter'), 400)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_lru_eviction(self):
+        """При переполнении вытесняются давно не читавшиеся ключи."""
+        cache = SQLiteCache(self.location,
+                            {'OPTIONS': {'MAX_ENTRIES': 10,
+                                         'CULL_FREQUENCY': 2}})
+        cache.set_many({f'key{i}': i for i in range(20)})
+        cache._db.execute('UPDATE cache_entries SET accessed = 0')
+        cache.get('key0')
+        cache._cull()
+        self.assertEqual(cache.get('key0'), 0)
+        self.assertEqual(len(cache.get_many(f'key{i}' for i in range(20))),
+                         10)
+
+
+class TwoTierCacheTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.location = os.path.join(self.directory, 'cache.sqlite3')
+        self.cache = two_tier(self.location)
+
+    def tearDown(self):
+        cache_backends._l1_stores.pop(self.location, None)
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_hot_keys_served_from_l1(self):
+        """Повторное чтение не идёт в L2, статистика ведётся по уровням."""
+        self.cache.set('key', 'value')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.cache._l2.set('key', 'changed behind the back')
+        self.assertEqual(self.cache.get('key'), 'value')
+        self.assertIsNone(self.cache.get('missing'))
+        self.assertEqual(self.cache.hit_ratios(),
+                         {'l1': 1 / 3, 'l2': 1 / 3, 'miss': 1 / 3})
+
+    def test_writes_invalidate_other_processes(self):
+        """Запись в другом процессе выбрасывает ключ из нашего L1."""
+        self.cache.set('key', 'old')
+        self.assertEqual(self.cache.get('key'), 'old')
+        worker = multiprocessing.Process(
+            target=set_in_other_process, args=(self.location, 'key', 'new'))
+        worker.start()
+        worker.join()
+        time.sleep(cache_backends.SYNC_INTERVAL)
+        self.assertEqual(self.cache.get('key'), 'new')
+
+    def test_incr_delete_and_clear(self):
+        """incr, delete и clear сразу видны через L1."""
+        self.cache.set('counter', 1)
+        self.assertEqual(self.cache.get('counter'), 1)
+        self.assertEqual(self.cache.incr('counter', 2), 3)
+        self.assertEqual(self.cache.get('counter'), 3)
+        self.cache.delete('counter')
+        self.assertIsNone(self.cache.get('counter'))
+        self.cache.set('key', 'value')
+        self.cache.get('key')
+        self.cache.clear()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_incr_missing_key_not_broadcast(self):
+        """incr отсутствующего ключа не пишет в канал инвалидаций."""
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+        count, = self.cache._channel.get().execute(
+            'SELECT COUNT(*) FROM cache_invalidations').fetchone()
+        self.assertEqual(count, 0)
+
+    def test_l1_copy_expires_with_l2(self):
+        """Копия в L1 живёт не дольше срока ключа в L2."""
+        self.cache.set('lock', 1, timeout=0.05)
+        self.assertEqual(self.cache.get('lock'), 1)
+        time.sleep(0.1)
+        self.assertIsNone(self.cache.get('lock'))
+
+    def test_sync_advances_to_last_read_row(self):
+        """last_seq — последняя прочитанная запись канала, не MAX потом."""
+        db = self.cache._channel.get()
+
+        def foreign_write(key):
+            db.execute('INSERT INTO cache_invalidations (key, pid)'
+                       ' VALUES (?, 0)', (key,))
+
+        def sync():
+            self.cache._l1.synced = float('-inf')
+            self.cache._sync()
+
+        self.cache.set('key', 'value')
+        sync()
+        foreign_write('unrelated')
+        self.cache.set('own', 1)
+        sync()
+        last, = db.execute(
+            'SELECT MAX(seq) FROM cache_invalidations').fetchone()
+        self.assertEqual(self.cache._l1.last_seq, last)
+        self.cache.get('key')
+        foreign_write(self.cache._l1_key('key', None))
+        sync()
+        self.cache.get('key')
+        self.assertEqual(self.cache.stats['l2'], 2)
+
+
+class CacheReleaseTest(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory, ignore_errors=True)
+
+    def test_keys_change_with_source(self):
+        """Правка шаблона меняет версию, а с ней и ключи кэша."""
+        template = os.path.join(self.directory, 'page.html')
+        with open(template, 'w') as file:
+            file.write('<p>старый</p>')
+        release = source_release(self.directory)
+        with open(template, 'w') as file:
+            file.write('<p>новый</p>')
+        self.assertNotEqual(source_release(self.directory), release)
+        for alias in ('default', 'shared'):
+            with self.subTest(alias=alias):
+                self.assertTrue(caches[alias].make_key('key').startswith(
+                    settings.CACHE_RELEASE))
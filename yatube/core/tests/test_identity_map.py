@@ -0,0 +1,54 @@
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from core.identity_map import IdentityMap, activate, current, deactivate
+from posts.models import Group, Post
+
+
+class IdentityMapTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        for i in range(5):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+        Post.objects.create(author=cls.author, text='Без группы')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_related_loaded_once_per_request(self):
+        """Автор и группа грузятся по разу на все querysets запроса."""
+        identity_map = IdentityMap()
+        posts, again = list(Post.objects.all()), list(Post.objects.all())
+        with self.assertNumQueries(2):
+            identity_map.attach(posts, 'author', 'group')
+        with self.assertNumQueries(0):
+            identity_map.attach(again, 'author', 'group')
+            self.assertIs(posts[0].author, again[-1].author)
+            self.assertIsNone(again[0].group)
+        self.assertEqual(identity_map.stats['loaded'], 2)
+        self.assertEqual(identity_map.stats['avoided'], 20)
+
+    def test_feed_rows_share_related(self):
+        """Строки ленты из JOIN делят автора и группу через карту."""
+        token = activate()
+        try:
+            rows = list(Post.objects.feed_rows())
+            identity_map = current()
+        finally:
+            deactivate(token)
+        self.assertIs(rows[0].author, rows[-1].author)
+        self.assertEqual(identity_map.stats['loaded'], 2)
+        self.assertEqual(identity_map.stats['avoided'], 9)
+
+    @override_settings(DEBUG=True)
+    def test_debug_report(self):
+        """В DEBUG ответ несёт отчёт карты идентичности."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response['X-Identity-Map'],
+                         'avoided=9 loaded=2 instances=2')
@@ -0,0 +1,152 @@
+from unittest import mock
+
+from django.contrib.auth.models import User, update_last_login
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from core import single_flight
+from core.middleware import LoadSheddingMiddleware
+from core.page_cache import stale_page_key
+from posts.models import Post
+
+
+class PageCacheMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(author=cls.author, text='Пост')
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_anonymous_page_served_from_cache(self):
+        """Повторный анонимный запрос отдаётся из кэша без запросов к БД."""
+        url = reverse('posts:index')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Войти')
+
+    def test_holes_filled_for_user(self):
+        """Авторизованный получает кэш со своими шапкой и формой."""
+        url = reverse('posts:post_detail', kwargs={'post_id': self.post.pk})
+        self.client.get(url)
+        response = self.reader_client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Пользователь: reader')
+        self.assertContains(response, 'csrfmiddlewaretoken')
+        self.assertNotContains(response, 'Редактировать запись')
+        self.assertNotContains(response, '<!--hole:')
+
+    def test_writes_purge_pages(self):
+        """Новый пост сбрасывает закэшированные страницы."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'miss')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_pages_purged_again_after_commit(self):
+        """Страница, отрисованная до коммита записи, после него сброшена."""
+        url = reverse('posts:index')
+        callbacks = []
+        with mock.patch('core.page_cache.transaction.on_commit',
+                        callbacks.append):
+            Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_login_keeps_pages(self):
+        """Вход не сбрасывает страницы, смена имени сбрасывает."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        update_last_login(None, self.author)
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
+        self.author.first_name = 'Лев'
+        self.author.save()
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+
+    def test_other_requests_not_cached(self):
+        """Посторонние параметры и другие страницы не кэшируются."""
+        urls = (reverse('posts:index') + '?utm=1',
+                reverse('posts:follow_index'),
+                reverse('about:author'))
+        for url in urls:
+            with self.subTest(url=url):
+                response = self.reader_client.get(url)
+                self.assertFalse(response.has_header('X-Page-Cache'))
+
+
+class LoadSheddingMiddlewareTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        Post.objects.create(author=cls.author, text='Старый пост')
+
+    def setUp(self):
+        cache.clear()
+
+    @mock.patch('core.middleware.MAX_IN_FLIGHT', 0)
+    @mock.patch.object(LoadSheddingMiddleware, 'start_refresh')
+    def test_stale_page_served_under_load(self, start_refresh):
+        """Под нагрузкой аноним получает прошлую копию страницы."""
+        url = reverse('posts:index')
+        self.assertEqual(self.client.get(url)['X-Page-Cache'], 'miss')
+        Post.objects.create(author=self.author, text='Свежий пост')
+        with self.assertNumQueries(0):
+            response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        self.assertNotContains(response, 'Свежий пост')
+        self.client.get(url)
+        start_refresh.assert_called_once()
+
+    @mock.patch('core.middleware.MAX_IN_FLIGHT', 0)
+    @mock.patch('core.middleware.connection')
+    @mock.patch.object(LoadSheddingMiddleware, 'start_refresh',
+                       autospec=True,
+                       side_effect=LoadSheddingMiddleware.refresh)
+    def test_stale_page_refreshed(self, start_refresh, connection):
+        """Фоновая отрисовка сохраняет свежую копию и снимает блокировку."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'stale')
+        start_refresh.assert_called_once()
+        request = start_refresh.call_args[0][1]
+        self.assertIsNone(cache.get(
+            single_flight.lock_key(stale_page_key(request))))
+        connection.close.assert_called_once()
+        response = self.client.get(url)
+        self.assertEqual(response['X-Page-Cache'], 'hit')
+        self.assertContains(response, 'Свежий пост')
+
+    def test_latency_total_follows_window(self):
+        """Сумма задержек убывает вместе с окном."""
+        middleware = LoadSheddingMiddleware(lambda request: None)
+        with mock.patch('core.middleware.time.monotonic',
+                        side_effect=[0, 2, 3, 4.5]):
+            middleware.timed_response(None)
+            middleware.timed_response(None)
+        self.assertEqual(middleware.total_latency, 3.5)
+        with mock.patch('core.middleware.time.monotonic', return_value=100):
+            self.assertFalse(middleware.overloaded())
+        self.assertEqual(middleware.total_latency, 0.0)
+
+    @mock.patch('core.middleware.MAX_IN_FLIGHT', 0)
+    def test_users_not_shed(self):
+        """Авторизованные под нагрузкой получают свежую страницу."""
+        url = reverse('posts:index')
+        self.client.get(url)
+        Post.objects.create(author=self.author, text='Свежий пост')
+        self.client.force_login(self.author)
+        self.assertContains(self.client.get(url), 'Свежий пост')
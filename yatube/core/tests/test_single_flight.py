@@ -0,0 +1,59 @@
+import threading
+import time
+
+from django.core.cache import cache
+from django.test import SimpleTestCase
+
+from core import single_flight
+
+
+class SingleFlightTest(SimpleTestCase):
+    def setUp(self):
+        cache.clear()
+        self.calls = []
+
+    def compute(self, value='fresh', delay=0):
+        def inner():
+            self.calls.append(value)
+            time.sleep(delay)
+            return value
+        return inner
+
+    def test_concurrent_misses_compute_once(self):
+        """Одновременные промахи по ключу считают значение один раз."""
+        results = []
+        barrier = threading.Barrier(5)
+
+        def request():
+            barrier.wait()
+            results.append(single_flight.get_or_set(
+                'key', self.compute(delay=0.3), 60))
+
+        threads = [threading.Thread(target=request) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.calls, ['fresh'])
+        self.assertEqual(results, ['fresh'] * 5)
+
+    def test_stale_value_served_while_locked(self):
+        """Пока ключ пересчитывается, отдаётся устаревшая копия."""
+        cache.set('key:stale', 'old')
+        cache.add(single_flight.lock_key('key'), 1)
+        value = single_flight.get_or_set(
+            'key', self.compute(), 60, stale_key='key:stale')
+        self.assertEqual(value, 'old')
+        self.assertEqual(self.calls, [])
+
+    def test_expiring_hot_key_recomputed_early(self):
+        """Ключ на исходе TTL пересчитывается до истечения."""
+        cache.set_many({'key': 'old',
+                        single_flight.meta_key('key'): (1.0, time.time())})
+        self.assertEqual(
+            single_flight.get_or_set('key', self.compute(), 60), 'fresh')
+        cache.set(single_flight.meta_key('key'), (1.0, time.time() + 3600))
+        self.assertEqual(
+            single_flight.get_or_set('key', self.compute('new'), 60),
+            'fresh')
+        self.assertEqual(self.calls, ['fresh'])
@@ -1,9 +1,34 @@
+import copy
+
+from django.http import HttpResponseNotFound
 from django.shortcuts import render
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .page_cache import fill_holes, hole_marker
+
+_not_found_body = None
 
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
 
 
+def known_not_found(request):
+    """404 для заведомо несуществующего объекта без запросов к БД.
+
+    Страница рендерится один раз с дырами на месте шапки и адреса и
+    дальше только заполняется под запрос.
+    """
+    global _not_found_body
+    if _not_found_body is None:
+        blank = copy.copy(request)
+        blank.punch_holes = True
+        _not_found_body = render_to_string(
+            'core/404.html',
+            {'path': mark_safe(hole_marker('request_path', {}))}, blank)
+    return HttpResponseNotFound(fill_holes(request, _not_found_body))
+
+
 def csrf_failure(request, reason=''):
     return render(request, 'core/403csrf.html')
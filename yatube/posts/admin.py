@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Post, Group, Comment, Follow
+from .models import AuthorStats, Post, Group, Comment, Follow
 
 
 @admin.register(Post)
@@ -32,3 +32,9 @@ class FollowAdmin(admin.ModelAdmin):
     list_display = ('user', 'author')
     list_filter = ('user', 'author')
     search_fields = ('user', 'author')
+
+
+@admin.register(AuthorStats)
+class AuthorStatsAdmin(admin.ModelAdmin):
+    list_display = ('author', 'posts', 'followers', 'following', 'comments')
+    search_fields = ('author__username',)
@@ -0,0 +1,13 @@
+"""Бенчмарки ленты: python manage.py benchmark <имя модуля>."""
+import time
+
+
+def measure(func, repeat=20):
+    """Лучшее время одного вызова func в миллисекундах и его результат."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
@@ -0,0 +1,77 @@
+"""LocMemCache против общего SQLiteCache под нагрузкой нескольких процессов.
+
+Каждый процесс читает ключи с распределением, близким к Zipf, и при
+промахе «рендерит» значение и кладёт его в кэш, а также увеличивает
+общий счётчик. У LocMemCache промахи повторяются в каждом процессе,
+а счётчик расходится по процессам.
+"""
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from django.core.cache.backends.locmem import LocMemCache
+
+from core.cache_backends import SQLiteCache
+
+WORKERS = 4
+OPERATIONS = 5_000
+KEYS = 2_000
+PAYLOAD = 'x' * 1024
+
+
+def make_cache(kind, location):
+    if kind == 'locmem':
+        return LocMemCache('benchmark', {'OPTIONS': {'MAX_ENTRIES': KEYS}})
+    return SQLiteCache(location, {'OPTIONS': {'MAX_ENTRIES': KEYS}})
+
+
+def worker(kind, location, seed, results):
+    cache = make_cache(kind, location)
+    rng = random.Random(seed)
+    hits = 0
+    start = time.perf_counter()
+    for _ in range(OPERATIONS):
+        key = f'key{int(rng.paretovariate(1.2)) % KEYS}'
+        if cache.get(key) is None:
+            cache.set(key, PAYLOAD)
+        else:
+            hits += 1
+        try:
+            cache.incr('counter')
+        except ValueError:
+            cache.add('counter', 1)
+    results.put((hits, time.perf_counter() - start, cache.get('counter')))
+
+
+def run_backend(kind, location):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker,
+                                args=(kind, location, seed, results))
+        for seed in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    rows = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    hits = sum(row[0] for row in rows)
+    elapsed = max(row[1] for row in rows)
+    counters = max(row[2] for row in rows)
+    total = WORKERS * OPERATIONS
+    return hits / total, total / elapsed, counters
+
+
+def run(stdout):
+    with tempfile.TemporaryDirectory() as directory:
+        location = os.path.join(directory, 'cache.sqlite3')
+        stdout.write(f'{WORKERS} процесса по {OPERATIONS} операций, '
+                     f'ожидаемый счётчик {WORKERS * OPERATIONS}')
+        stdout.write(f'{"backend":>8} {"hit ratio":>10} {"ops/s":>10} '
+                     f'{"counter":>8}')
+        for kind in ('locmem', 'sqlite'):
+            hit_ratio, throughput, counter = run_backend(kind, location)
+            stdout.write(f'{kind:>8} {hit_ratio:>10.3f} {throughput:>10.0f} '
+                         f'{counter:>8}')
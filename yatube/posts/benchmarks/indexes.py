@@ -0,0 +1,75 @@
+"""Запросы страниц posts.views с индексами 0020 и без них.
+
+Данные засеиваются во временной транзакции. Сначала замер с
+индексами из Meta.indexes, затем они удаляются DROP INDEX в той же
+транзакции, и всё откатывается после замера.
+"""
+from django.db import connection, transaction
+
+from posts.models import Comment, Follow, Group, Post, User
+from posts.query_plans import view_querysets
+
+from . import measure
+
+POSTS = 200_000
+AUTHORS = 1_000
+GROUPS = 20
+COMMENTS = 100_000
+FOLLOWING = 50
+BATCH = 50
+
+
+def seed():
+    User.objects.bulk_create(
+        User(username=f'benchmark_{i}') for i in range(AUTHORS))
+    authors = list(User.objects.filter(username__startswith='benchmark_'))
+    Group.objects.bulk_create(
+        Group(title=f'Группа {i}', slug=f'benchmark-{i}')
+        for i in range(GROUPS))
+    groups = list(Group.objects.filter(slug__startswith='benchmark-'))
+    Post.objects.bulk_create(
+        (Post(author=authors[i % AUTHORS], group=groups[i % GROUPS],
+              text='Текст поста') for i in range(POSTS)),
+        batch_size=BATCH)
+    post_ids = list(Post.objects.values_list('pk', flat=True))
+    Comment.objects.bulk_create(
+        (Comment(post_id=post_ids[i * 7 % len(post_ids)],
+                 author=authors[i % AUTHORS], text='Комментарий')
+         for i in range(COMMENTS)),
+        batch_size=BATCH)
+    Follow.objects.bulk_create(
+        Follow(user=authors[0], author=author)
+        for author in authors[1:FOLLOWING + 1])
+    with connection.cursor() as cursor:
+        # auto_now_add дал всем одно время; разносим по минутам.
+        cursor.execute(
+            "UPDATE posts_post SET pub_date = "
+            "datetime('2020-01-01', (id % 99991) || ' minutes')")
+        cursor.execute(
+            "UPDATE posts_comment SET created = "
+            "datetime('2020-01-01', (id % 99989) || ' minutes')")
+    return authors[0].pk, groups[0].pk, post_ids[-1]
+
+
+def drop_indexes():
+    with connection.cursor() as cursor:
+        for model in (Post, Comment):
+            for index in model._meta.indexes:
+                cursor.execute(f'DROP INDEX "{index.name}"')
+
+
+def timings(querysets):
+    return [measure(lambda: list(queryset.all()), repeat=5)[0]
+            for _, queryset in querysets]
+
+
+def run(stdout):
+    with transaction.atomic():
+        querysets = view_querysets(*seed())
+        after = timings(querysets)
+        drop_indexes()
+        before = timings(querysets)
+        transaction.set_rollback(True)
+    stdout.write(f'{"query":<28} {"before ms":>10} {"after ms":>10}')
+    for (name, _), old, new in zip(querysets, before, after):
+        stdout.write(f'{name:<28} {old:>10.3f} {new:>10.3f}')
@@ -0,0 +1,29 @@
+"""Время рендера и размер paginator.html при росте числа постов."""
+from django.template.loader import render_to_string
+
+from posts.constants import PAG_PAGE_NUM
+from posts.models import Post
+from posts.utils import CursorPaginator
+
+from . import measure
+
+POST_COUNTS = (1_000, 10_000, 100_000, 500_000)
+
+
+def render_page(count, number):
+    paginator = CursorPaginator(Post.objects.none(), PAG_PAGE_NUM)
+    # Подменяем COUNT, чтобы не засеивать сотни тысяч строк.
+    paginator.count = count
+    page = paginator.get_page(number)
+    return render_to_string('posts/includes/paginator.html',
+                            {'page_obj': page})
+
+
+def run(stdout):
+    stdout.write(f'{"posts":>8} {"page":>6} {"ms":>8} {"bytes":>7}')
+    for count in POST_COUNTS:
+        middle = count // PAG_PAGE_NUM // 2
+        for number in (1, middle):
+            elapsed, html = measure(lambda: render_page(count, number))
+            stdout.write(
+                f'{count:>8} {number:>6} {elapsed:>8.3f} {len(html):>7}')
@@ -0,0 +1,64 @@
+"""Память и время сборки страницы ленты: модели против PostRow.
+
+Посты засеиваются во временной транзакции и откатываются после замера.
+Путь моделей — Post.objects.all() с подгрузкой авторов и групп через
+карту идентичности, как лента строилась до read-моделей.
+"""
+import tracemalloc
+
+from django.db import transaction
+
+from core.identity_map import IdentityMap
+from posts.models import Group, Post, User
+
+from . import measure
+
+AUTHORS = 20
+GROUPS = 5
+PAGE_SIZES = (10, 100, 1_000)
+
+
+def model_page(size):
+    posts = list(Post.objects.all()[:size])
+    return IdentityMap().attach(posts, 'author', 'group')
+
+
+def row_page(size):
+    return list(Post.objects.feed_rows()[:size])
+
+
+def memory_kib(func):
+    """Пик памяти при сборке и сколько занимает готовая страница."""
+    tracemalloc.start()
+    result = func()
+    kept, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return peak / 1024, kept / 1024
+
+
+def seed(count):
+    authors = [User.objects.create_user(username=f'benchmark_{i}',
+                                        first_name='Имя', last_name='Автор')
+               for i in range(AUTHORS)]
+    groups = [Group.objects.create(title=f'Группа {i}',
+                                   slug=f'benchmark-{i}')
+              for i in range(GROUPS)]
+    Post.objects.bulk_create(
+        Post(author=authors[i % AUTHORS], group=groups[i % GROUPS],
+             text='Текст поста ' * 10, image='posts/benchmark.gif')
+        for i in range(count))
+
+
+def run(stdout):
+    stdout.write(f'{"posts":>6} {"path":>6} {"ms":>8} '
+                 f'{"peak KiB":>9} {"kept KiB":>9}')
+    with transaction.atomic():
+        seed(max(PAGE_SIZES))
+        for size in PAGE_SIZES:
+            for name, build in (('models', model_page), ('rows', row_page)):
+                elapsed, _ = measure(lambda: build(size))
+                peak, kept = memory_kib(lambda: build(size))
+                stdout.write(f'{size:>6} {name:>6} {elapsed:>8.3f} '
+                             f'{peak:>9.1f} {kept:>9.1f}')
+        transaction.set_rollback(True)
@@ -0,0 +1,72 @@
+"""Список id ленты подписок: JOIN, Timeline и буферы процесса.
+
+Данные засеиваются во временной транзакции и откатываются после
+замера. Для буферов отдельно показана первая сборка, когда их ещё
+нужно прочитать из БД, и сборка по тёплым буферам.
+"""
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from posts import timeline
+from posts.feed_ids import load_ids
+from posts.models import Follow, Post, Timeline, User
+from posts.recent_posts import RecentPosts
+
+from . import measure
+
+AUTHORS = 10_000
+POSTS_PER_AUTHOR = 10
+FOLLOWING = (10, 1_000, 10_000)
+BATCH = 50
+
+
+def seed():
+    User.objects.bulk_create(
+        (User(username=f'benchmark_{i}') for i in range(AUTHORS)),
+        batch_size=BATCH)
+    authors = list(User.objects.filter(username__startswith='benchmark_'))
+    Post.objects.bulk_create(
+        (Post(author=authors[i % AUTHORS], text='Текст поста')
+         for i in range(AUTHORS * POSTS_PER_AUTHOR)),
+        batch_size=BATCH)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE posts_post SET pub_date = "
+            "datetime('2020-01-01', (id % 99991) || ' minutes')")
+    return authors
+
+
+def reader(authors, following):
+    user = User.objects.create(username=f'benchmark_reader_{following}')
+    followed = authors[:following]
+    Follow.objects.bulk_create(
+        (Follow(user=user, author=author) for author in followed),
+        batch_size=BATCH)
+    Timeline.objects.bulk_create(
+        (Timeline(user=user, post_id=pk, pub_date=pub_date)
+         for pk, pub_date in Post.objects.filter(
+             author__in=followed).values_list('pk', 'pub_date')),
+        batch_size=BATCH)
+    return user
+
+
+def run(stdout):
+    stdout.write(f'{"following":>9} {"join ms":>9} {"timeline ms":>11} '
+                 f'{"cold ms":>9} {"buffers ms":>10}')
+    with transaction.atomic():
+        authors = seed()
+        for following in FOLLOWING:
+            user = reader(authors, following)
+            author_ids = [author.pk for author in authors[:following]]
+            join, expected = measure(lambda: load_ids(
+                Post.objects.filter(author__following__user=user)), 5)
+            timeline_ms, _ = measure(
+                lambda: timeline.id_loader(user)(None), 5)
+            cache.clear()
+            buffers = RecentPosts()
+            cold, _ = measure(lambda: buffers.feed_ids(author_ids), 1)
+            warm, (_, ids) = measure(lambda: buffers.feed_ids(author_ids), 5)
+            assert ids == expected[1][:len(ids)]
+            stdout.write(f'{following:>9} {join:>9.3f} {timeline_ms:>11.3f} '
+                         f'{cold:>9.3f} {warm:>10.3f}')
+        transaction.set_rollback(True)
@@ -0,0 +1,103 @@
+"""Рекомендации «на кого подписаться» на синтетическом графе без БД.
+
+USERS читателей подписаны на FOLLOWING авторов каждый, популярность
+авторов убывает по закону Ципфа: всего USERS * FOLLOWING рёбер.
+Показаны сборка CSR, полный пересчёт, пик памяти по tracemalloc,
+размер файлов, поиск по memmap и пересчёт после того, как CHANGED
+читателей сменили одну подписку.
+"""
+import os
+import tempfile
+import tracemalloc
+
+import numpy as np
+from django.test import override_settings
+
+from posts import suggestions
+
+from . import measure
+
+USERS = 100_000
+FOLLOWING = 10
+CHANGED = 1_000
+LOOKUPS = 1_000
+
+
+def graph(rng):
+    """Рёбра (users, authors): первые FOLLOWING разных авторов из выборки."""
+    users = np.repeat(np.arange(1, USERS + 1), FOLLOWING * 4)
+    authors = np.minimum(rng.zipf(1.3, len(users)), USERS)
+    keys = np.unique(users * (USERS + 1) + authors)
+    users, authors = keys // (USERS + 1), keys % (USERS + 1)
+    rank = np.arange(len(users)) - np.searchsorted(users, users)
+    keep = rank < FOLLOWING
+    return users[keep], authors[keep]
+
+
+def edit(indptr, indices, changed, rng):
+    """CSR, где у каждого из changed первая подписка заменена случайной."""
+    indices = indices.copy()
+    indices[indptr[changed]] = rng.integers(1, USERS + 1, len(changed))
+    rows = len(indptr) - 1
+    keys = np.unique(suggestions.row_ids(indptr) * rows + indices)
+    return suggestions.to_csr(keys // rows, keys % rows, rows)
+
+
+def peak(func):
+    """Пик памяти func в мегабайтах и её результат."""
+    tracemalloc.start()
+    result = func()
+    _, top = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return top / 2**20, result
+
+
+def run(stdout):
+    rng = np.random.default_rng(0)
+    users, authors = graph(rng)
+    rows = USERS + 1
+    csr_ms, (indptr, indices) = measure(
+        lambda: suggestions.to_csr(users, authors, rows), 3)
+    readers = np.flatnonzero(np.diff(indptr))
+    full_ms, matrix = measure(
+        lambda: suggestions.top_k(indptr, indices, readers), 1)
+    full_mb, _ = peak(lambda: suggestions.top_k(indptr, indices, readers))
+    stdout.write(f'рёбер: {len(indices)}, читателей: {len(readers)}')
+    stdout.write(f'CSR: {csr_ms:.1f} мс')
+    stdout.write(f'полный пересчёт: {full_ms:.1f} мс, '
+                 f'пик памяти {full_mb:.1f} МБ')
+
+    with tempfile.TemporaryDirectory() as root, \
+            override_settings(SUGGESTIONS_ROOT=root):
+        store = suggestions.SuggestionStore()
+        stored = np.zeros((rows, matrix.shape[1]), dtype=np.int32)
+        stored[readers] = matrix
+        store.save(suggestions.INDPTR, indptr)
+        store.save(suggestions.INDICES, indices)
+        store.save(suggestions.SUGGESTIONS, stored)
+        size = sum(os.path.getsize(os.path.join(root, name))
+                   for name in os.listdir(root))
+        sample = rng.choice(readers, LOOKUPS)
+        lookup_ms, _ = measure(
+            lambda: [store.for_user(int(pk)) for pk in sample], 5)
+        stdout.write(f'файлы: {size / 2**20:.1f} МБ, поиск: '
+                     f'{lookup_ms * 1000 / LOOKUPS:.1f} мкс на пользователя')
+
+    changed = rng.choice(readers, CHANGED, replace=False)
+    new_indptr, new_indices = edit(indptr, indices, changed, rng)
+
+    def refresh():
+        affected = suggestions.affected_users(
+            indptr, indices, new_indptr, new_indices)
+        return affected, suggestions.top_k(new_indptr, new_indices, affected)
+
+    inc_ms, (affected, partial) = measure(refresh, 3)
+    inc_mb, _ = peak(refresh)
+    stored[affected] = partial
+    check = rng.choice(readers, LOOKUPS)
+    full = np.zeros_like(stored)
+    full[check] = suggestions.top_k(new_indptr, new_indices, check)
+    assert (stored[check] == full[check]).all()
+    stdout.write(f'инкрементально ({CHANGED} сменили подписку): '
+                 f'{len(affected)} пользователей, {inc_ms:.1f} мс, '
+                 f'пик памяти {inc_mb:.1f} МБ')
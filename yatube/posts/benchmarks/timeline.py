@@ -0,0 +1,66 @@
+"""Список id ленты подписок: JOIN Follow и Post против Timeline.
+
+Данные засеиваются во временной транзакции и откатываются после
+замера. Подписки создаются bulk_create без сигналов, Timeline
+заполняется timeline.backfill. Последняя строка — те же подписки, где
+MERGED авторов без рассылки подмешиваются при чтении.
+"""
+from django.db import connection, transaction
+
+from posts import timeline
+from posts.feed_ids import load_ids
+from posts.models import AuthorStats, Follow, Post, User
+
+from . import measure
+
+AUTHORS = 500
+POSTS_PER_AUTHOR = 100
+FOLLOWING = (10, 100, 500)
+MERGED = 5
+BATCH = 50
+
+
+def seed():
+    User.objects.bulk_create(
+        User(username=f'benchmark_{i}') for i in range(AUTHORS))
+    authors = list(User.objects.filter(username__startswith='benchmark_'))
+    Post.objects.bulk_create(
+        (Post(author=authors[i % AUTHORS], text='Текст поста')
+         for i in range(AUTHORS * POSTS_PER_AUTHOR)),
+        batch_size=BATCH)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "UPDATE posts_post SET pub_date = "
+            "datetime('2020-01-01', (id % 99991) || ' minutes')")
+    return authors
+
+
+def reader(authors, following):
+    user = User.objects.create(username=f'benchmark_reader_{following}')
+    Follow.objects.bulk_create(
+        Follow(user=user, author=author) for author in authors[:following])
+    for author in authors[:following]:
+        timeline.backfill(user.pk, author.pk)
+    return user
+
+
+def compare(stdout, label, user):
+    join, expected = measure(lambda: load_ids(
+        Post.objects.filter(author__following__user=user)))
+    fan_out, ids = measure(lambda: timeline.id_loader(user)(None))
+    assert ids == expected
+    stdout.write(f'{label:>9} {join:>8.3f} {fan_out:>11.3f}')
+
+
+def run(stdout):
+    stdout.write(f'{"following":>9} {"join ms":>8} {"timeline ms":>11}')
+    with transaction.atomic():
+        authors = seed()
+        for following in FOLLOWING:
+            user = reader(authors, following)
+            compare(stdout, following, user)
+        AuthorStats.objects.bulk_create(
+            AuthorStats(author=author, fan_out=False)
+            for author in authors[:MERGED])
+        compare(stdout, f'{following}+{MERGED}', user)
+        transaction.set_rollback(True)
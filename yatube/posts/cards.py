@@ -0,0 +1,44 @@
+"""Кэш отрендеренных карточек постов.
+
+Карточка хранится под ключом (id, version) поста, поэтому правка поста
+или новый комментарий просто дают новый ключ. Карточки страницы
+достаются одним get_many, рендерятся только промахи.
+"""
+from collections import Counter
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from .constants import CARD_CACHE_TIMEOUT
+
+CARD_TEMPLATE = 'posts/includes/posts_card.html'
+
+stats = Counter()
+
+
+def card_key(post, group=None):
+    # На странице группы ссылка на группу в карточке не выводится.
+    return f'post_card:{post.pk}:{post.version}:{int(group is None)}'
+
+
+def render_cards(posts, group=None):
+    posts = list(posts)
+    keys = [card_key(post, group) for post in posts]
+    cards = cache.get_many(keys)
+    rendered = {}
+    for post, key in zip(posts, keys):
+        if key not in cards:
+            rendered[key] = render_to_string(
+                CARD_TEMPLATE, {'post': post, 'group': group})
+    if rendered:
+        cache.set_many(rendered, CARD_CACHE_TIMEOUT)
+        cards.update(rendered)
+    stats['hits'] += len(posts) - len(rendered)
+    stats['misses'] += len(rendered)
+    return [mark_safe(cards[key]) for key in keys]
+
+
+def hit_ratio():
+    total = stats['hits'] + stats['misses']
+    return stats['hits'] / total if total else 0.0
@@ -0,0 +1,59 @@
+"""Превью последних комментариев для карточек ленты.
+
+Снимок COMMENT_PREVIEW_NUM последних комментариев поста хранится в
+кэше, поэтому лента получает их одним get_many на страницу.
+"""
+from django.core.cache import cache
+from django.db.models import OuterRef, Subquery
+
+from .constants import COMMENT_PREVIEW_NUM, COMMENT_PREVIEW_TIMEOUT
+from .models import Comment
+
+
+def preview_key(post_id):
+    return f'comment_preview:{post_id}'
+
+
+def comment_snapshot(comment):
+    author = comment.author
+    return {
+        'author': author.get_full_name() or author.username,
+        'text': comment.text,
+        'created': comment.created,
+    }
+
+
+def push_comment_preview(comment):
+    """Добавляет новый комментарий в начало снимка поста."""
+    key = preview_key(comment.post_id)
+    preview = cache.get(key)
+    if preview is None:
+        return
+    preview = [comment_snapshot(comment)] + preview
+    cache.set(key, preview[:COMMENT_PREVIEW_NUM], COMMENT_PREVIEW_TIMEOUT)
+
+
+def attach_comment_previews(posts):
+    """Проставляет post.comment_preview всем постам страницы."""
+    posts = list(posts)
+    keys = {post.pk: preview_key(post.pk) for post in posts}
+    cached = cache.get_many(keys.values())
+    missing = [post.pk for post in posts
+               if post.comment_count and keys[post.pk] not in cached]
+    if missing:
+        fresh = {pk: [] for pk in missing}
+        # Не больше COMMENT_PREVIEW_NUM строк на пост: LIMIT в
+        # коррелированном подзапросе по индексу (post, created).
+        latest = Comment.objects.filter(
+            post=OuterRef('post')).order_by('-created', '-pk').values(
+            'pk')[:COMMENT_PREVIEW_NUM]
+        comments = (Comment.objects.filter(post__in=missing,
+                                           pk__in=Subquery(latest))
+                    .select_related('author').order_by('-created', '-pk'))
+        for comment in comments:
+            fresh[comment.post_id].append(comment_snapshot(comment))
+        fresh = {keys[pk]: preview for pk, preview in fresh.items()}
+        cache.set_many(fresh, COMMENT_PREVIEW_TIMEOUT)
+        cached.update(fresh)
+    for post in posts:
+        post.comment_preview = cached.get(keys[post.pk], [])
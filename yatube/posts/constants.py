@@ -1,2 +1,25 @@
 ADM_TOOL_TEXT_LIM = 15
 PAG_PAGE_NUM = 10
+PAG_ON_EACH_SIDE = 2
+PAG_ON_ENDS = 1
+FEED_COUNT_TIMEOUT = 60 * 60 * 24
+FEED_COUNT_ESTIMATE_TIMEOUT = 60 * 10
+COUNT_ESTIMATE_THRESHOLD = 100_000
+COUNT_SAMPLE_SIZE = 1_000
+COMMENT_PREVIEW_NUM = 3
+COMMENT_PREVIEW_TIMEOUT = 60 * 60 * 24
+FEED_CACHE_TIMEOUT = 60 * 60
+CARD_CACHE_TIMEOUT = 60 * 60 * 24
+ROW_CACHE_TIMEOUT = 60 * 10
+FEED_IDS_LIMIT = 1_000
+FEED_IDS_TIMEOUT = 60 * 60 * 24
+TIMELINE_FANOUT_LIMIT = 10_000
+TIMELINE_BATCH_SIZE = 500
+TIMELINE_BACKFILL_LIMIT = FEED_IDS_LIMIT + 1
+RECENT_POSTS_PER_AUTHOR = 50
+RECENT_POSTS_BUCKETS = 256
+RECENT_POSTS_MAX_AUTHORS = 5_000
+FOLLOW_SET_TIMEOUT = 60 * 60 * 24
+SUGGESTIONS_STORED = 10
+SUGGESTIONS_SHOWN = 5
+SUGGESTIONS_MAX_PAIRS = 1_000_000
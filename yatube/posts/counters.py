@@ -0,0 +1,132 @@
+"""Кэшируемые COUNT для пагинируемых лент.
+
+Счётчики лежат в кэше по ключу ленты и поддерживаются сигналами
+Post/Follow. Если ленту не удалось найти в кэше, а постов больше
+COUNT_ESTIMATE_THRESHOLD, вместо полного скана берётся оценка.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import single_flight
+
+from .constants import (COUNT_ESTIMATE_THRESHOLD, COUNT_SAMPLE_SIZE,
+                        FEED_COUNT_ESTIMATE_TIMEOUT, FEED_COUNT_TIMEOUT)
+from .models import Follow
+
+INDEX = 'index'
+GROUP = 'group'
+AUTHOR = 'author'
+FOLLOW = 'follow'
+
+
+FOLLOW_GENERATION_KEY = 'feed_generation:follow'
+
+
+def follow_generation():
+    generation = cache.get(FOLLOW_GENERATION_KEY)
+    if generation is None:
+        cache.add(FOLLOW_GENERATION_KEY, time.time_ns(), None)
+        generation = cache.get(FOLLOW_GENERATION_KEY)
+    return generation
+
+
+def follow_feeds_changed():
+    """Сбрасывает кэши всех лент подписок сменой их поколения.
+
+    Так обрабатываются посты авторов без рассылки: править кэш каждого
+    их подписчика — O(подписчиков) записей на пост.
+    """
+    def bump():
+        try:
+            cache.incr(FOLLOW_GENERATION_KEY)
+        except ValueError:
+            pass
+    bump()
+    # Лента могла пересобраться до коммита поста.
+    transaction.on_commit(bump)
+
+
+def feed_key(prefix, feed, value=None):
+    """Ключ кэша ленты; ключи лент подписок включают их поколение."""
+    key = f'{prefix}:{feed}:{value}'
+    if feed == FOLLOW:
+        key = f'{key}:{follow_generation()}'
+    return key
+
+
+def feed_count_key(feed, value=None):
+    return feed_key('feed_count', feed, value)
+
+
+def estimate_count(queryset, sample=COUNT_SAMPLE_SIZE):
+    """Оценка COUNT по выборке последних постов.
+
+    MAX(pk) даёт число строк таблицы с точностью до удалений, доля
+    подходящих под фильтр постов берётся среди `sample` последних.
+    """
+    newest = queryset.model.objects.order_by('-pk').values_list(
+        'pk', flat=True)
+    total = newest.first()
+    if total is None:
+        return 0
+    pks = list(newest[:sample])
+    hits = queryset.filter(pk__gte=pks[-1]).count()
+    return round(total * hits / len(pks))
+
+
+def count_timeout(count):
+    """Оценку держим в кэше меньше, чем точный счётчик."""
+    if count > COUNT_ESTIMATE_THRESHOLD:
+        return FEED_COUNT_ESTIMATE_TIMEOUT
+    return FEED_COUNT_TIMEOUT
+
+
+class FeedCounter:
+    """Источник count для CursorPaginator с кэшем по ленте."""
+
+    def __init__(self, feed, value=None):
+        self.key = feed_count_key(feed, value)
+
+    def __call__(self, queryset):
+        return single_flight.get_or_set(
+            self.key, lambda: self.count(queryset), count_timeout)
+
+    def count(self, queryset):
+        capped = queryset.order_by().values('pk')[
+            :COUNT_ESTIMATE_THRESHOLD + 1]
+        count = queryset.model.objects.filter(pk__in=capped).count()
+        if count > COUNT_ESTIMATE_THRESHOLD:
+            count = estimate_count(queryset)
+        return count
+
+
+def post_feeds(post, follow=True):
+    """Ленты (feed, value), в которые попадает пост.
+
+    follow=False — без лент подписок, не читая подписчиков автора.
+    """
+    feeds = [(INDEX, None)]
+    if post.group_id:
+        feeds.append((GROUP, post.group_id))
+    if post.author_id:
+        feeds.append((AUTHOR, post.author_id))
+    if post.author_id and follow:
+        followers = Follow.objects.filter(
+            author_id=post.author_id).values_list('user_id', flat=True)
+        feeds.extend((FOLLOW, user_id) for user_id in followers)
+    return feeds
+
+
+def change_counts(feeds, delta):
+    for feed, value in feeds:
+        try:
+            cache.incr(feed_count_key(feed, value), delta)
+        except ValueError:
+            # Счётчика нет в кэше: посчитается при следующем просмотре.
+            pass
+
+
+def reset_counts(feeds):
+    cache.delete_many([feed_count_key(feed, value) for feed, value in feeds])
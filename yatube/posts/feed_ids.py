@@ -0,0 +1,90 @@
+"""Кэш упорядоченных id постов ленты.
+
+Для каждой ленты (feed, value) хранится пара (complete, ids): id
+последних FEED_IDS_LIMIT постов в порядке (-pub_date, -id) и признак,
+что в списке вся лента. Правки постов его не меняют, новые посты
+дописываются в начало сигналами, удалённые вычёркиваются. Запись, не
+взявшая блокировку списка, просто сбрасывает его: список пересоберёт
+следующий просмотр. Списки лент подписок так не правятся: их
+сбрасывают, см. signals.reset_follow_feeds и
+counters.follow_feeds_changed.
+"""
+from itertools import islice
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import single_flight
+
+from .constants import FEED_IDS_LIMIT, FEED_IDS_TIMEOUT
+from .counters import feed_key
+
+CURSOR_ORDERING = ('-pub_date', '-pk')
+EDIT_LOCK_TIMEOUT = 5
+
+
+def ids_key(feed, value=None):
+    return feed_key('feed_ids', feed, value)
+
+
+def limit_ids(ids):
+    """(complete, ids) из упорядоченных id ленты."""
+    ids = list(islice(ids, FEED_IDS_LIMIT + 1))
+    return len(ids) <= FEED_IDS_LIMIT, ids[:FEED_IDS_LIMIT]
+
+
+def load_ids(queryset):
+    return limit_ids(queryset.order_by(*CURSOR_ORDERING).values_list(
+        'pk', flat=True)[:FEED_IDS_LIMIT + 1])
+
+
+def feed_ids(feed, value, queryset, load=load_ids):
+    """(complete, ids) ленты из кэша или из БД, один запрос на всех.
+
+    load(queryset) собирает список, если в кэше его нет.
+    """
+    return single_flight.get_or_set(
+        ids_key(feed, value), lambda: load(queryset), FEED_IDS_TIMEOUT)
+
+
+def _edit(feeds, change):
+    """change((complete, ids)) -> новая пара или None, чтобы сбросить."""
+    for feed, value in feeds:
+        key = ids_key(feed, value)
+        lock = single_flight.lock_key(key)
+        if not cache.add(lock, 1, EDIT_LOCK_TIMEOUT):
+            cache.delete(key)
+            continue
+        try:
+            entry = cache.get(key)
+            if entry is not None:
+                entry = change(*entry)
+                if entry is None:
+                    cache.delete(key)
+                else:
+                    cache.set(key, entry, FEED_IDS_TIMEOUT)
+        finally:
+            cache.delete(lock)
+
+
+def push(feeds, post):
+    """Новый пост — в начало списков его лент."""
+    def prepend(complete, ids):
+        ids = [post.pk] + ids
+        return complete and len(ids) <= FEED_IDS_LIMIT, ids[:FEED_IDS_LIMIT]
+
+    def check(complete, ids):
+        # Список мог пересобраться до коммита поста.
+        return (complete, ids) if post.pk in ids else None
+
+    _edit(feeds, prepend)
+    transaction.on_commit(lambda: _edit(feeds, check))
+
+
+def remove(feeds, post):
+    _edit(feeds, lambda complete, ids: (
+        complete, [pk for pk in ids if pk != post.pk]))
+
+
+def reset(feeds):
+    cache.delete_many([ids_key(feed, value) for feed, value in feeds])
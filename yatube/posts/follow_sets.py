@@ -0,0 +1,102 @@
+"""Кэш подписок пользователя: отсортированный array('I') id авторов.
+
+Проверка «подписан ли на X» — бинарный поиск в памяти, а подписка на
+N авторов занимает 4N байт вместо N экземпляров модели. Подписка и
+отписка правят закэшированный массив; запись, не взявшая блокировку
+массива, сбрасывает его, как и в feed_ids.
+"""
+from array import array
+from bisect import bisect_left
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core import single_flight
+
+from .constants import FOLLOW_SET_TIMEOUT
+from .models import Follow
+
+EDIT_LOCK_TIMEOUT = 5
+
+
+class FollowSet:
+    __slots__ = ('ids',)
+
+    def __init__(self, ids):
+        self.ids = ids
+
+    def __contains__(self, author_id):
+        index = bisect_left(self.ids, author_id)
+        return index < len(self.ids) and self.ids[index] == author_id
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+def follow_set_key(user_id):
+    return f'follow_set:{user_id}'
+
+
+def load(user_id):
+    return array('I', Follow.objects.filter(user_id=user_id).order_by(
+        'author_id').values_list('author_id', flat=True)).tobytes()
+
+
+def follow_set(user_id):
+    """FollowSet авторов, на которых подписан user_id."""
+    ids = array('I')
+    ids.frombytes(single_flight.get_or_set(
+        follow_set_key(user_id), lambda: load(user_id), FOLLOW_SET_TIMEOUT))
+    return FollowSet(ids)
+
+
+def _edit(user_id, change):
+    """change(FollowSet) -> новый массив id или None, чтобы сбросить."""
+    key = follow_set_key(user_id)
+    lock = single_flight.lock_key(key)
+    if not cache.add(lock, 1, EDIT_LOCK_TIMEOUT):
+        cache.delete(key)
+        return
+    try:
+        data = cache.get(key)
+        if data is not None:
+            ids = array('I')
+            ids.frombytes(data)
+            ids = change(FollowSet(ids))
+            if ids is None:
+                cache.delete(key)
+            else:
+                cache.set(key, ids.tobytes(), FOLLOW_SET_TIMEOUT)
+    finally:
+        cache.delete(lock)
+
+
+def add(user_id, author_id):
+    def insert(follows):
+        if author_id not in follows:
+            follows.ids.insert(bisect_left(follows.ids, author_id),
+                               author_id)
+        return follows.ids
+
+    def check(follows):
+        # Массив мог пересобраться до коммита подписки.
+        return follows.ids if author_id in follows else None
+
+    _edit(user_id, insert)
+    transaction.on_commit(lambda: _edit(user_id, check))
+
+
+def remove(user_id, author_id):
+    def drop(follows):
+        if author_id in follows:
+            follows.ids.remove(author_id)
+        return follows.ids
+
+    def check(follows):
+        return None if author_id in follows else follows.ids
+
+    _edit(user_id, drop)
+    transaction.on_commit(lambda: _edit(user_id, check))
@@ -0,0 +1,57 @@
+"""Поколенческий кэш фрагментов ленты.
+
+Ключ фрагмента включает ленту, страницу (номер или курсор) и версию
+ленты. Записи постов и комментариев увеличивают версию, поэтому старые
+фрагменты просто перестают запрашиваться и вытесняются по TTL. Пока
+новая версия рендерится, остальные запросы получают последнюю отрисованную
+(stale_key без версии), см. core.single_flight.
+"""
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .constants import FEED_CACHE_TIMEOUT
+
+PAGE_PARAMS = ('page', 'after', 'before')
+
+
+def version_key(feed, value=None):
+    return f'feed_version:{feed}:{value}'
+
+
+def feed_version(feed, value=None):
+    key = version_key(feed, value)
+    version = cache.get(key)
+    if version is None:
+        # Начальная версия уникальна, чтобы после вытеснения ключа
+        # не совпасть с версией ещё живых фрагментов.
+        cache.add(key, time.time_ns(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(feeds):
+    keys = [version_key(feed, value) for feed, value in feeds]
+
+    def bump():
+        for key in keys:
+            try:
+                cache.incr(key)
+            except ValueError:
+                pass
+    bump()
+    # Фрагмент, отрисованный до коммита, попал в новую версию.
+    transaction.on_commit(bump)
+
+
+class FeedFragment:
+    """Параметры {% cache %} для фрагмента ленты в шаблоне."""
+
+    timeout = FEED_CACHE_TIMEOUT
+
+    def __init__(self, request, feed, value=None):
+        position = '&'.join(f'{param}={request.GET[param]}'
+                            for param in PAGE_PARAMS if param in request.GET)
+        self.stale_key = f'{feed}:{value}:{position}'
+        self.key = f'{self.stale_key}:{feed_version(feed, value)}'
@@ -0,0 +1,68 @@
+"""Персональные фрагменты страниц постов для core.page_cache."""
+from django.template.loader import render_to_string
+
+from core import identity_map
+from core.page_cache import hole
+
+from . import suggestions
+from .constants import SUGGESTIONS_SHOWN
+from .forms import CommentForm
+from .follow_sets import follow_set
+from .models import User
+
+
+@hole('switcher')
+def switcher(request):
+    return render_to_string('posts/includes/switcher.html', request=request)
+
+
+@hole('comment_form')
+def comment_form(request, post_id):
+    return render_to_string(
+        'posts/includes/comment_form.html',
+        {'post_id': post_id, 'form': CommentForm()},
+        request=request)
+
+
+def is_following(request, author_id):
+    """Подписан ли пользователь запроса на автора; без запросов к Follow."""
+    if not request.user.is_authenticated:
+        return False
+    if '_follow_set' not in request.__dict__:
+        request._follow_set = follow_set(request.user.pk)
+    return author_id in request._follow_set
+
+
+@hole('follow_button')
+def follow_button(request, author_id, username):
+    following = is_following(request, author_id)
+    return render_to_string(
+        'posts/includes/follow_button.html',
+        {'author_id': author_id, 'username': username,
+         'following': following},
+        request=request)
+
+
+@hole('post_edit_button')
+def post_edit_button(request, post_id, author_id):
+    return render_to_string(
+        'posts/includes/post_edit_button.html',
+        {'post_id': post_id, 'author_id': author_id},
+        request=request)
+
+
+@hole('suggestions')
+def suggested_authors(request):
+    """Рекомендации из suggestions.store без уже подписанных авторов."""
+    if not request.user.is_authenticated:
+        return ''
+    ids = [pk for pk in suggestions.store.for_user(request.user.pk)
+           if pk != request.user.pk and not is_following(request, pk)]
+    ids = ids[:SUGGESTIONS_SHOWN]
+    if not ids:
+        return ''
+    authors = identity_map.current().get_many(User, ids)
+    return render_to_string(
+        'posts/includes/suggestions.html',
+        {'authors': [authors[pk] for pk in ids if pk in authors]},
+        request=request)
@@ -0,0 +1,109 @@
+"""Bloom-фильтры существующих username и slug групп.
+
+Фильтр строится в каждом процессе при первом обращении и дополняется
+сигналами. Новое значение увеличивает поколение в общем кэше и
+кладётся в кэш под номером этого поколения: остальные процессы
+дописывают пропущенные значения в свой фильтр, а перестраивают его из
+БД, только если отстали больше чем на MAX_CATCH_UP или значения уже
+вытеснены. Поколение меняется только после коммита, иначе другой
+процесс мог бы перестроить фильтр без нового значения и принять новое
+поколение. Переименованные и удалённые значения остаются в
+фильтре: это лишь ложное «возможно есть», которое проверит БД.
+"""
+import threading
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.bloom import BloomFilter
+
+from .models import Group, User
+
+MIN_CAPACITY = 1024
+MAX_CATCH_UP = 1000
+ADDED_TIMEOUT = 60 * 60 * 24
+
+
+class KnownNames:
+    def __init__(self, name, load):
+        self.name = name
+        self.load = load
+        self.filter = None
+        self.generation = None
+        self.lock = threading.Lock()
+
+    @property
+    def generation_key(self):
+        return f'known_names:{self.name}'
+
+    def current_generation(self):
+        generation = cache.get(self.generation_key)
+        if generation is None:
+            cache.add(self.generation_key, time.time_ns(), None)
+            generation = cache.get(self.generation_key)
+        return generation
+
+    def added_key(self, generation):
+        return f'{self.generation_key}:{generation}'
+
+    def catch_up(self, generation):
+        """Дописывает значения пропущенных поколений; False — не вышло."""
+        missed = generation - self.generation
+        if not 0 < missed <= MAX_CATCH_UP:
+            return False
+        keys = [self.added_key(self.generation + step)
+                for step in range(1, missed + 1)]
+        added = cache.get_many(keys)
+        if len(added) < len(keys):
+            return False
+        for value in added.values():
+            self.filter.add(value)
+        self.generation = generation
+        return True
+
+    def rebuild(self, generation):
+        names = list(self.load())
+        bloom = BloomFilter(max(MIN_CAPACITY, len(names) * 2))
+        for name in names:
+            bloom.add(name)
+        self.filter, self.generation = bloom, generation
+
+    def might_exist(self, value):
+        """False — значения точно нет, в БД можно не ходить."""
+        generation = self.current_generation()
+        with self.lock:
+            stale = self.filter is None or (
+                self.generation != generation
+                and not self.catch_up(generation))
+            if stale or self.filter.full:
+                self.rebuild(generation)
+            return value in self.filter
+
+    def add(self, value):
+        """Сразу — в фильтр процесса, остальным — после коммита."""
+        with self.lock:
+            if self.filter is not None:
+                self.filter.add(value)
+        transaction.on_commit(lambda: self.publish(value))
+
+    def publish(self, value):
+        try:
+            generation = cache.incr(self.generation_key)
+        except ValueError:
+            generation = None
+        else:
+            cache.set(self.added_key(generation), value, ADDED_TIMEOUT)
+        with self.lock:
+            if self.filter is None:
+                return
+            self.filter.add(value)
+            if generation is not None and self.generation == generation - 1:
+                # Наш фильтр был актуален и уже содержит value.
+                self.generation = generation
+
+
+usernames = KnownNames(
+    'username', lambda: User.objects.values_list('username', flat=True))
+group_slugs = KnownNames(
+    'group_slug', lambda: Group.objects.values_list('slug', flat=True))
@@ -0,0 +1,23 @@
+import importlib
+import pkgutil
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts import benchmarks
+
+
+class Command(BaseCommand):
+    help = 'Запускает бенчмарк из posts.benchmarks'
+
+    def add_arguments(self, parser):
+        names = [module.name for module in
+                 pkgutil.iter_modules(benchmarks.__path__)]
+        parser.add_argument('name', choices=names)
+
+    def handle(self, *args, **options):
+        try:
+            module = importlib.import_module(
+                f'posts.benchmarks.{options["name"]}')
+        except ImportError as error:
+            raise CommandError(error)
+        module.run(self.stdout)
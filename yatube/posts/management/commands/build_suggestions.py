@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from posts.suggestions import store
+
+
+class Command(BaseCommand):
+    help = ('Снимает граф подписок и пересчитывает рекомендации '
+            '«на кого подписаться»')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental', action='store_true',
+            help='Пересчитать только пользователей с изменёнными подписками '
+                 'и их подписчиков')
+
+    def handle(self, *args, **options):
+        built = store.build(incremental=options['incremental'])
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано пользователей: {built}'))
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.models import Group, Post, User
+from posts.query_plans import (explain, has_index, problems, recommend,
+                               view_querysets)
+
+
+class Command(BaseCommand):
+    help = ('Показывает EXPLAIN QUERY PLAN запросов posts.views, полные '
+            'сканы и сортировки во временном B-tree, и советует индексы')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true',
+                            help='Завершиться с ошибкой, если советует '
+                                 'новые индексы')
+
+    def handle(self, *args, **options):
+        advice = {}
+        for name, queryset in view_querysets(*self.sample_ids()):
+            plan = explain(queryset)
+            found = problems(plan)
+            self.stdout.write(
+                self.style.WARNING(name) if found else name)
+            for detail in plan:
+                self.stdout.write(f'    {detail}')
+            for problem in found:
+                self.stdout.write(self.style.WARNING(f'  ! {problem}'))
+            fields = recommend(queryset) if found else ()
+            if fields:
+                advice.setdefault((queryset.model, fields), []).append(name)
+        missing = 0
+        self.stdout.write('')
+        for (model, fields), names in advice.items():
+            line = (f'{model._meta.label}: models.Index(fields='
+                    f'{list(fields)}) — {", ".join(names)}')
+            if has_index(model, fields):
+                self.stdout.write(f'{line} (уже есть)')
+            else:
+                missing += 1
+                self.stdout.write(self.style.WARNING(line))
+        if not missing:
+            self.stdout.write(self.style.SUCCESS('Новых индексов не нужно'))
+        elif options['check']:
+            raise CommandError(f'Недостающих индексов: {missing}')
+
+    @staticmethod
+    def sample_ids():
+        """Реальные id, если они есть: план зависит от статистики."""
+        return [model.objects.values_list('pk', flat=True).first() or 1
+                for model in (User, Group, Post)]
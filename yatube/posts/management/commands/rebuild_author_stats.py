@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.models import AuthorStats
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает таблицу AuthorStats по постам и подпискам'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            rebuilt = AuthorStats.objects.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Пересчитано авторов: {len(rebuilt)}'))
@@ -0,0 +1,125 @@
+import io
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIRequest
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+from sorl.thumbnail import get_thumbnail
+
+from posts.constants import PAG_PAGE_NUM
+from posts.models import AuthorStats, Group, Post
+
+# Те же параметры, что у {% thumbnail %} в карточке поста.
+THUMBNAIL_GEOMETRY = '960x339'
+THUMBNAIL_OPTIONS = {'crop': 'center', 'upscale': True}
+
+
+def default_host():
+    """Первый конкретный хост из ALLOWED_HOSTS."""
+    for host in settings.ALLOWED_HOSTS:
+        if host != '*' and not host.startswith('.'):
+            return host
+    return 'localhost'
+
+
+class Command(BaseCommand):
+    help = ('Прогревает кэши после деплоя: первые страницы ленты, '
+            'популярные группы и профили, миниатюры их постов')
+
+    def add_arguments(self, parser):
+        parser.add_argument('--pages', type=int, default=3,
+                            help='Сколько страниц главной прогреть')
+        parser.add_argument('--groups', type=int, default=5)
+        parser.add_argument('--profiles', type=int, default=5)
+        parser.add_argument('--workers', type=int, default=4,
+                            help='Сколько запросов выполнять одновременно')
+        parser.add_argument('--host', default=default_host(),
+                            help='Host запросов, по умолчанию из '
+                                 'ALLOWED_HOSTS')
+
+    def handle(self, *args, **options):
+        # Тот же стек middleware, что у воркеров, без сигналов запроса:
+        # соединения с БД закрывает run().
+        self.handler = BaseHandler()
+        self.handler.load_middleware()
+        self.host = options['host']
+        feeds = self.feeds(options)
+        urls = [url for url, _ in feeds]
+        images = {post.image.name: post.image
+                  for _, posts in feeds for post in posts if post.image}
+        started = time.perf_counter()
+        self.stdout.write(f'Страниц: {len(urls)}, миниатюр: {len(images)}')
+        for elapsed, status, url in self.run(self.render, urls, options):
+            self.stdout.write(f'{elapsed:8.1f} ms  {status}  {url}')
+        for elapsed, _, name in self.run(self.thumbnail, images.values(),
+                                         options):
+            self.stdout.write(f'{elapsed:8.1f} ms  thumb  {name}')
+        total = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f'Прогрето за {total:.2f} s'))
+
+    @staticmethod
+    def feeds(options):
+        """Адреса для прогрева и посты, которые на них попадут."""
+        posts = Post.objects.order_by('-pub_date', '-pk')
+        index = reverse('posts:index')
+        feeds = [(index, posts[:PAG_PAGE_NUM])]
+        feeds.extend(
+            (f'{index}?page={page}',
+             posts[(page - 1) * PAG_PAGE_NUM:page * PAG_PAGE_NUM])
+            for page in range(2, options['pages'] + 1))
+        groups = Group.objects.annotate(
+            post_count=Count('posts')).order_by('-post_count')
+        feeds.extend(
+            (reverse('posts:group_list', args=[group.slug]),
+             posts.filter(group=group)[:PAG_PAGE_NUM])
+            for group in groups[:options['groups']])
+        authors = AuthorStats.objects.select_related('author').order_by(
+            '-followers')
+        feeds.extend(
+            (reverse('posts:profile', args=[stats.author.username]),
+             posts.filter(author=stats.author_id)[:PAG_PAGE_NUM])
+            for stats in authors[:options['profiles']])
+        return feeds
+
+    def render(self, url):
+        path, _, query = url.partition('?')
+        request = WSGIRequest({
+            'REQUEST_METHOD': 'GET',
+            'PATH_INFO': path,
+            'QUERY_STRING': query,
+            'SCRIPT_NAME': '',
+            'SERVER_NAME': self.host,
+            'SERVER_PORT': '80',
+            'HTTP_HOST': self.host,
+            'wsgi.url_scheme': 'http',
+            'wsgi.input': io.BytesIO(),
+        })
+        return self.handler.get_response(request).status_code, url
+
+    @staticmethod
+    def thumbnail(image):
+        get_thumbnail(image, THUMBNAIL_GEOMETRY, **THUMBNAIL_OPTIONS)
+        return None, image.name
+
+    @staticmethod
+    def run(func, items, options):
+        """func по всем items не более чем в options['workers'] потоков."""
+        def timed(item):
+            start = time.perf_counter()
+            try:
+                result = func(item)
+            finally:
+                if workers > 1:
+                    connection.close()
+            return ((time.perf_counter() - start) * 1000, *result)
+
+        workers = options['workers']
+        if workers <= 1:
+            return [timed(item) for item in items]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return list(pool.map(timed, items))
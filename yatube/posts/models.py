@@ -2,8 +2,14 @@ from django.db import models
 from django.contrib.auth import get_user_model
 
 from posts.constants import ADM_TOOL_TEXT_LIM
+from posts.read_models import CommentQuerySet, PostQuerySet
+from posts.row_cache import RowCache, RowCacheManager
 
 User = get_user_model()
+# Поля пользователя, которые читают страницы: пароль и прочее в кэш
+# не попадают.
+user_rows = RowCache(
+    User, fields=('id', 'username', 'first_name', 'last_name'))
 
 
 class Post(models.Model):
@@ -38,15 +44,42 @@ class Post(models.Model):
         upload_to='posts/',
         blank=True
     )
+    comment_count = models.PositiveIntegerField(
+        default=0,
+        editable=False,
+        verbose_name='Комментарии'
+    )
+    version = models.PositiveIntegerField(
+        default=1,
+        editable=False,
+        verbose_name='Версия'
+    )
+
+    objects = RowCacheManager.from_queryset(PostQuerySet)()
 
     class Meta:
         verbose_name = "Посты"
         verbose_name_plural = "Посты"
         ordering = ('-pub_date',)
+        indexes = [
+            models.Index(fields=['pub_date'], name='post_pub_date_idx'),
+            models.Index(fields=['author', 'pub_date'],
+                         name='post_author_pub_date_idx'),
+            models.Index(fields=['group', 'pub_date'],
+                         name='post_group_pub_date_idx'),
+        ]
 
     def __str__(self):
         return self.text[:ADM_TOOL_TEXT_LIM]
 
+    def save(self, *args, **kwargs):
+        bump = self.pk is not None
+        if bump:
+            self.version = models.F('version') + 1
+        super().save(*args, **kwargs)
+        if bump:
+            self.refresh_from_db(fields=('version',))
+
 
 class Group(models.Model):
     title = models.CharField(max_length=200, verbose_name="Название группы")
@@ -58,6 +91,8 @@ class Group(models.Model):
     )
     description = models.TextField(blank=True, verbose_name="Описание группы")
 
+    objects = RowCacheManager()
+
     class Meta:
         verbose_name = "Группы"
         verbose_name_plural = "Группы"
@@ -83,8 +118,14 @@ class Comment(models.Model):
     created = models.DateTimeField(auto_now_add=True,
                                    verbose_name='Создан')
 
+    objects = CommentQuerySet.as_manager()
+
     class Meta:
         ordering = ['-created']
+        indexes = [
+            models.Index(fields=['post', 'created'],
+                         name='comment_post_created_idx'),
+        ]
         verbose_name_plural = 'Коментарии'
         verbose_name = 'Коментарий'
 
@@ -114,3 +155,102 @@ class Follow(models.Model):
 
     def __str__(self):
         return f'{self.user} подписался на {self.author}'
+
+
+class Timeline(models.Model):
+    """Пост автора в ленте подписок читателя, см. posts.timeline."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Читатель')
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='timeline',
+        verbose_name='Пост')
+    pub_date = models.DateTimeField(
+        null=True,
+        verbose_name='Дата публикации')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'post'],
+                                    name='unique_timeline_user_post')
+        ]
+        indexes = [
+            models.Index(fields=['user', 'pub_date', 'post'],
+                         name='timeline_user_pub_date_idx'),
+        ]
+        verbose_name_plural = 'Ленты подписок'
+        verbose_name = 'Запись ленты подписок'
+
+    def __str__(self):
+        return f'{self.post_id} в ленте {self.user}'
+
+
+class AuthorStatsManager(RowCacheManager):
+    def rebuild(self, authors=None):
+        """Пересчитывает статистику по базе для authors (или для всех)."""
+        users = User.objects.all() if authors is None else authors
+        users = users.annotate(
+            stats_posts=models.Count('posts', distinct=True),
+            stats_followers=models.Count('following', distinct=True),
+            stats_following=models.Count('follower', distinct=True),
+            stats_comments=models.Count('comments', distinct=True),
+        )
+        rebuilt = []
+        for user in users:
+            stats, _ = self.update_or_create(author=user, defaults={
+                'posts': user.stats_posts,
+                'followers': user.stats_followers,
+                'following': user.stats_following,
+                'comments': user.stats_comments,
+            })
+            rebuilt.append(stats)
+        return rebuilt
+
+    def for_author(self, author):
+        if author is None:
+            return None
+        try:
+            return self.cached(pk=author.pk)
+        except AuthorStats.DoesNotExist:
+            stats, = self.rebuild(User.objects.filter(pk=author.pk))
+            return stats
+
+    def change(self, author_id, **deltas):
+        """Атомарно сдвигает счётчики автора: change(1, posts=1)."""
+        self.filter(author_id=author_id).update(**{
+            field: models.F(field) + delta
+            for field, delta in deltas.items()
+        })
+        self.invalidate(author_id)
+
+
+class AuthorStats(models.Model):
+    author = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+        verbose_name='Автор')
+    posts = models.PositiveIntegerField(default=0, verbose_name='Посты')
+    followers = models.PositiveIntegerField(
+        default=0, verbose_name='Подписчики')
+    following = models.PositiveIntegerField(
+        default=0, verbose_name='Подписки')
+    comments = models.PositiveIntegerField(
+        default=0, verbose_name='Комментарии')
+    fan_out = models.BooleanField(
+        default=True, editable=False,
+        verbose_name='Рассылать посты в ленты подписчиков')
+
+    objects = AuthorStatsManager()
+
+    class Meta:
+        verbose_name_plural = 'Статистика авторов'
+        verbose_name = 'Статистика автора'
+
+    def __str__(self):
+        return f'Статистика {self.author}'
@@ -0,0 +1,95 @@
+"""EXPLAIN QUERY PLAN для запросов страниц posts.views.
+
+view_querysets() повторяет querysets, которые выполняют представления:
+список id ленты, страница PostRow, ограниченный COUNT, комментарии,
+подписки читателя. problems() находит в плане полный скан таблицы и
+сортировку во временном B-tree, recommend() предлагает индекс: поля
+фильтров на равенство по основной таблице, затем поля сортировки.
+Id ленты подписок читаются из Timeline по индексу, а запрос её
+страницы нужен только за пределами списка id и сортировку сохраняет.
+"""
+from django.db.models.lookups import Exact
+
+from .constants import (COUNT_ESTIMATE_THRESHOLD, FEED_IDS_LIMIT,
+                        PAG_PAGE_NUM)
+from .feed_ids import CURSOR_ORDERING
+from .models import Comment, Follow, Group, Post, User
+from .timeline import (follow_feed, merged_authors, merged_ids,
+                       timeline_ids)
+
+FULL_SCAN = 'полный скан'
+TEMP_SORT = 'сортировка во временном B-tree'
+
+
+def feed_querysets(name, queryset):
+    """Запросы одной ленты: список id, страница карточек, COUNT."""
+    ordered = queryset.order_by(*CURSOR_ORDERING)
+    return [
+        (f'{name}: id ленты', ordered.values_list('pk', flat=True)[
+            :FEED_IDS_LIMIT + 1]),
+        (f'{name}: страница', ordered.feed_rows()[:PAG_PAGE_NUM]),
+        (f'{name}: COUNT', queryset.order_by().values('pk')[
+            :COUNT_ESTIMATE_THRESHOLD + 1]),
+    ]
+
+
+def view_querysets(user_id=1, group_id=1, post_id=1):
+    author, group = User(pk=user_id), Group(pk=group_id)
+    post = Post(pk=post_id)
+    return [
+        *feed_querysets('index', Post.objects.all()),
+        *feed_querysets('group_list', group.posts.all()),
+        *feed_querysets('profile', author.posts.all()),
+        ('follow_index: id ленты', timeline_ids(author, 'post_id')),
+        ('follow_index: id без рассылки', merged_ids(
+            merged_authors(author))),
+        *feed_querysets('follow_index', follow_feed(author))[1:],
+        ('подписки читателя', Follow.objects.filter(user=author).order_by(
+            'author_id').values_list('author_id', flat=True)),
+        ('post_detail: комментарии', post.comments.for_detail()),
+        ('превью комментариев', Comment.objects.filter(
+            post__in=[post_id]).order_by('-created')),
+    ]
+
+
+def explain(queryset):
+    """Строки detail плана SQLite без служебных колонок id."""
+    return [line.split(' ', 3)[-1]
+            for line in queryset.explain().splitlines()]
+
+
+def problems(plan):
+    found = []
+    for detail in plan:
+        if detail.startswith('SCAN') and 'INDEX' not in detail:
+            found.append(f'{FULL_SCAN}: {detail}')
+        elif 'TEMP B-TREE' in detail:
+            found.append(f'{TEMP_SORT}: {detail}')
+    return found
+
+
+def recommend(queryset):
+    """Поля индекса для queryset или () если подсказать нечего."""
+    query = queryset.query
+    alias = query.get_initial_alias()
+    fields = [child.lhs.target.name for child in query.where.children
+              if isinstance(child, Exact)
+              and getattr(child.lhs, 'alias', None) == alias]
+    ordering = query.order_by or (
+        queryset.model._meta.ordering if query.default_ordering else ())
+    pk_names = ('pk', '-pk', queryset.model._meta.pk.name,
+                f'-{queryset.model._meta.pk.name}')
+    # pk в конце не нужен: rowid и так входит в каждый индекс SQLite.
+    # Направление тоже: по возрастающему индексу SQLite идёт и назад, а
+    # с DESC-полем -pub_date, -pk потребовал бы досортировки по rowid.
+    fields += [field.lstrip('-') for field in ordering
+               if field not in pk_names]
+    if not ordering or not fields:
+        return ()
+    return tuple(dict.fromkeys(fields))
+
+
+def has_index(model, fields):
+    """Есть ли у модели индекс ровно по fields (ForeignKey по имени поля)."""
+    return any(tuple(field.lstrip('-') for field in index.fields) == fields
+               for index in model._meta.indexes)
@@ -0,0 +1,128 @@
+"""Лёгкие объекты для рендера ленты вместо экземпляров моделей.
+
+PostQuerySet.feed_rows() выбирает только нужные карточке поля одним
+values_list()-запросом с JOIN автора и группы и отдаёт PostRow со слотами и
+готовыми URL. Авторы и группы разделяются между постами запроса через
+карту идентичности. Строки сравниваются с моделями по pk, поэтому
+post.author == user работает как раньше.
+"""
+from functools import lru_cache
+
+from django.db import models
+from django.db.models.query import ValuesListIterable
+from django.urls import reverse
+
+from core import identity_map
+
+FEED_FIELDS = (
+    'id', 'text', 'pub_date', 'image', 'comment_count', 'version',
+    'author_id', 'author__username', 'author__first_name',
+    'author__last_name', 'group_id', 'group__slug', 'group__title',
+)
+URL_PLACEHOLDER = '999999999'
+
+
+@lru_cache(maxsize=None)
+def url_template(name):
+    """URL с числовым аргументом: reverse один раз, дальше format."""
+    return reverse(name, args=[URL_PLACEHOLDER]).replace(
+        URL_PLACEHOLDER, '{}')
+
+
+class Row:
+    __slots__ = ()
+
+    @property
+    def pk(self):
+        return self.id
+
+    def __eq__(self, other):
+        if isinstance(other, models.Model):
+            return (other._meta.model_name == self.model_name
+                    and other.pk == self.pk)
+        if isinstance(other, Row):
+            return type(other) is type(self) and other.pk == self.pk
+        return NotImplemented
+
+    def __hash__(self):
+        return hash((type(self), self.pk))
+
+    def __repr__(self):
+        return f'<{type(self).__name__}: {self.pk}>'
+
+
+class AuthorRow(Row):
+    __slots__ = ('id', 'username', 'full_name', 'url')
+    model_name = 'user'
+
+    def __init__(self, id, username, first_name, last_name):
+        self.id = id
+        self.username = username
+        self.full_name = f'{first_name} {last_name}'.strip()
+        self.url = reverse('posts:profile', args=[username])
+
+    def __str__(self):
+        return self.username
+
+
+class GroupRow(Row):
+    __slots__ = ('id', 'slug', 'title', 'url')
+    model_name = 'group'
+
+    def __init__(self, id, slug, title):
+        self.id = id
+        self.slug = slug
+        self.title = title
+        self.url = reverse('posts:group_list', args=[slug])
+
+    def __str__(self):
+        return self.title
+
+
+class PostRow(Row):
+    __slots__ = ('id', 'text', 'pub_date', 'image', 'comment_count',
+                 'version', 'author_id', 'group_id', 'author', 'group',
+                 'url', 'comment_preview')
+    model_name = 'post'
+
+    def __init__(self, values, author, group):
+        (self.id, self.text, self.pub_date, self.image, self.comment_count,
+         self.version, self.author_id) = values[:7]
+        self.group_id = values[10]
+        self.author = author
+        self.group = group
+        self.url = url_template('posts:post_detail').format(self.id)
+        self.comment_preview = ()
+
+
+class PostRowIterable(ValuesListIterable):
+    def __iter__(self):
+        shared = identity_map.current()
+        for values in super().__iter__():
+            author = group = None
+            author_id, group_id = values[6], values[10]
+            if author_id is not None:
+                author = shared.get_or_build(
+                    AuthorRow, author_id,
+                    lambda: AuthorRow(author_id, *values[7:10]))
+            if group_id is not None:
+                group = shared.get_or_build(
+                    GroupRow, group_id,
+                    lambda: GroupRow(group_id, *values[11:13]))
+            yield PostRow(values, author, group)
+
+
+class PostQuerySet(models.QuerySet):
+    def feed_rows(self):
+        """Посты как PostRow: для лент, где модель не нужна."""
+        rows = self.values_list(*FEED_FIELDS)
+        rows._iterable_class = PostRowIterable
+        return rows
+
+
+class CommentQuerySet(models.QuerySet):
+    def for_detail(self):
+        """Комментарии для страницы поста: автор в том же запросе."""
+        return self.select_related('author').only(
+            'text', 'created', 'post_id', 'author__username',
+            'author__first_name', 'author__last_name')
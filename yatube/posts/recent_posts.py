@@ -0,0 +1,187 @@
+"""Последние посты авторов в памяти процесса для ленты подписок.
+
+Для каждого автора процесс держит до RECENT_POSTS_PER_AUTHOR пар
+(pub_date, id) от новых к старым: новый пост вытесняет самый старый.
+Буфер — кортеж, который целиком заменяется под блокировкой, поэтому
+читатели сливают буферы без копий. Список id ленты собирается
+heap-слиянием буферов авторов, на которых подписан читатель.
+
+Актуальность проверяется по поколениям в общем кэше, одному на группу
+из авторов (id % RECENT_POSTS_BUCKETS): так одно чтение ленты делает
+не больше RECENT_POSTS_BUCKETS обращений к кэшу. Сигналы постов
+увеличивают поколение сразу и после коммита и правят буфер своего
+процесса, другие процессы перечитают авторов группы из БД.
+
+Процесс держит буферы не больше чем RECENT_POSTS_MAX_AUTHORS авторов,
+давно не читавшиеся вытесняются (LRU).
+"""
+import heapq
+import threading
+import time
+from collections import OrderedDict
+from itertools import groupby, islice, takewhile
+
+from django.core.cache import cache
+from django.db import transaction
+
+from .constants import (FEED_IDS_LIMIT, RECENT_POSTS_BUCKETS,
+                        RECENT_POSTS_MAX_AUTHORS, RECENT_POSTS_PER_AUTHOR)
+from .follow_sets import follow_set
+from .models import Post
+
+LOAD_CHUNK = 500
+
+
+class RecentPosts:
+    def __init__(self, size=RECENT_POSTS_PER_AUTHOR,
+                 buckets=RECENT_POSTS_BUCKETS,
+                 max_authors=RECENT_POSTS_MAX_AUTHORS):
+        self.size = size
+        self.buckets = buckets
+        self.max_authors = max_authors
+        # author_id -> (поколение, (обрезан ли буфер, ((pub_date, id), ...)))
+        self.buffers = OrderedDict()
+        self.lock = threading.Lock()
+
+    @staticmethod
+    def generation_key(bucket):
+        return f'recent_posts:{bucket}'
+
+    def generations(self, author_ids):
+        """{номер группы: поколение} для групп авторов author_ids."""
+        keys = {bucket: self.generation_key(bucket)
+                for bucket in {author_id % self.buckets
+                               for author_id in author_ids}}
+        found = cache.get_many(keys.values())
+        # Как в known_names: новое поколение не совпадёт со старыми буферами.
+        missing = {key: time.time_ns() for key in keys.values()
+                   if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            found.update(missing)
+        return {bucket: found[key] for bucket, key in keys.items()}
+
+    def load(self, author_ids):
+        """Буферы авторов из БД, по LOAD_CHUNK авторов на запрос."""
+        loaded = {author_id: [] for author_id in author_ids}
+        for start in range(0, len(author_ids), LOAD_CHUNK):
+            rows = Post.objects.filter(
+                author_id__in=author_ids[start:start + LOAD_CHUNK]
+            ).order_by('author_id', '-pub_date', '-pk').values_list(
+                'author_id', 'pub_date', 'pk')
+            for author_id, posts in groupby(rows, lambda row: row[0]):
+                loaded[author_id] = [
+                    (pub_date, pk)
+                    for _, pub_date, pk in islice(posts, self.size + 1)]
+        return loaded
+
+    def recent(self, author_ids):
+        """{author_id: (обрезан, посты)}; устаревшие буферы перечитываются."""
+        generations = self.generations(author_ids)
+        buckets = self.buckets
+        result = {}
+        stale = []
+        with self.lock:
+            buffers = self.buffers
+            for author_id in author_ids:
+                generation, buffer = buffers.get(author_id, (None, None))
+                if generation == generations[author_id % buckets]:
+                    result[author_id] = buffer
+                    buffers.move_to_end(author_id)
+                else:
+                    stale.append(author_id)
+        if stale:
+            loaded = self.load(stale)
+            with self.lock:
+                for author_id, posts in loaded.items():
+                    buffer = (len(posts) > self.size,
+                              tuple(posts[:self.size]))
+                    self.buffers[author_id] = (
+                        generations[author_id % buckets], buffer)
+                    result[author_id] = buffer
+                self.evict()
+        return result
+
+    def evict(self):
+        """Вызывается под self.lock."""
+        while len(self.buffers) > self.max_authors:
+            self.buffers.popitem(last=False)
+
+    def changed(self, author_id, change=None):
+        """change(посты) -> посты для буфера этого процесса.
+
+        Без change буфер просто сбрасывается.
+        """
+        try:
+            generation = cache.incr(
+                self.generation_key(author_id % self.buckets))
+        except ValueError:
+            generation = None
+        with self.lock:
+            entry = self.buffers.pop(author_id, None)
+            if (change is not None and entry is not None
+                    and generation is not None
+                    and entry[0] == generation - 1):
+                # Буфер был актуален: правим его, а не перечитываем.
+                truncated, posts = entry[1]
+                posts = change(posts)
+                self.buffers[author_id] = (generation, (
+                    truncated or len(posts) > self.size, posts[:self.size]))
+
+    def on_change(self, author_id, change=None):
+        if author_id is None:
+            return
+        self.changed(author_id, change)
+        # Другой процесс мог перечитать буфер до коммита записи.
+        transaction.on_commit(lambda: self.changed(author_id, change))
+
+    def push(self, post):
+        """Новый пост — в начало буфера автора."""
+        def prepend(posts):
+            if any(pk == post.pk for _, pk in posts):
+                return posts
+            return ((post.pub_date, post.pk),) + posts
+        self.on_change(post.author_id, prepend)
+
+    def remove(self, post):
+        def drop(posts):
+            return tuple(entry for entry in posts if entry[1] != post.pk)
+        self.on_change(post.author_id, drop)
+
+    def forget(self, author_id):
+        self.on_change(author_id)
+
+    def feed_ids(self, author_ids):
+        """(complete, ids) слиянием буферов author_ids от новых к старым.
+
+        Сливаются только буферы FEED_IDS_LIMIT + 1 авторов с самыми
+        свежими постами: у остальных каждый пост старше стольких же
+        постов этих авторов. У обрезанного буфера за последним постом
+        могут быть ещё посты, поэтому слияние останавливается на самом
+        свежем из таких хвостов.
+        """
+        buffers = [buffer for buffer in self.recent(author_ids).values()
+                   if buffer[1]]
+        if len(buffers) > FEED_IDS_LIMIT + 1:
+            newest = heapq.nlargest(
+                FEED_IDS_LIMIT + 1, [posts[0] for _, posts in buffers])[-1]
+            buffers = [buffer for buffer in buffers
+                       if buffer[1][0] >= newest]
+        floor = max((posts[-1] for truncated, posts in buffers
+                     if truncated), default=None)
+        merged = heapq.merge(*(posts for _, posts in buffers), reverse=True)
+        if floor is not None:
+            merged = takewhile(lambda entry: entry >= floor, merged)
+        ids = [pk for _, pk in islice(merged, FEED_IDS_LIMIT + 1)]
+        return (floor is None and len(ids) <= FEED_IDS_LIMIT,
+                ids[:FEED_IDS_LIMIT])
+
+
+recent_posts = RecentPosts()
+
+
+def id_loader(user):
+    """load для feed_ids: ленту подписок собирают буферы процесса."""
+    def load(queryset):
+        return recent_posts.feed_ids(list(follow_set(user.pk)))
+    return load
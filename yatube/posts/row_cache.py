@@ -0,0 +1,112 @@
+"""Read-through кэш строк для поиска одного объекта.
+
+Строка лежит под ключом row:<модель>:<pk>, поиск по другому полю
+(slug, username) идёт через ключ-ссылку row:<модель>:<поле>:<значение>
+на pk. Сохранение и удаление объекта сбрасывают ключ строки, а ссылка
+после переименования перестаёт совпадать с полем строки и
+перепроверяется по БД, поэтому старое имя не найдёт новый объект.
+
+Моделям проекта кэш даёт RowCacheManager, чужим (User) — RowCache
+рядом с моделью.
+"""
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.http import Http404
+
+from .constants import ROW_CACHE_TIMEOUT
+
+
+class RowCache:
+    """Кэш строк model; fields — хранить только эти поля, без остальных.
+
+    С fields объект восстанавливается как из only(fields): прочие поля
+    отложены и при обращении дочитаются из БД.
+    """
+
+    def __init__(self, model, fields=None, manager=None):
+        self.model = model
+        self.fields = fields
+        self.manager = manager
+        uid = f'row_cache:{model._meta.label}'
+        post_save.connect(self._changed, sender=model, weak=False,
+                          dispatch_uid=uid)
+        post_delete.connect(self._changed, sender=model, weak=False,
+                            dispatch_uid=uid)
+
+    def row_key(self, pk):
+        return f'row:{self.model._meta.label_lower}:{pk}'
+
+    def alias_key(self, field, value):
+        return f'row:{self.model._meta.label_lower}:{field}:{value}'
+
+    def load(self, **lookup):
+        objects = self.manager or self.model._default_manager
+        if self.fields is not None:
+            objects = objects.only(*self.fields)
+        return objects.get(**lookup)
+
+    def dump(self, obj):
+        if self.fields is None:
+            return obj
+        return tuple(getattr(obj, field) for field in self.fields)
+
+    def restore(self, row):
+        if self.fields is None:
+            return row
+        return self.model.from_db(DEFAULT_DB_ALIAS, self.fields, row)
+
+    def cached(self, **lookup):
+        """get(field=value) через кэш; DoesNotExist — как у get."""
+        (field, value), = lookup.items()
+        if field in ('pk', self.model._meta.pk.name):
+            row = cache.get(self.row_key(value))
+            if row is not None:
+                return self.restore(row)
+            obj = self.load(pk=value)
+            cache.set(self.row_key(value), self.dump(obj), ROW_CACHE_TIMEOUT)
+            return obj
+        alias = self.alias_key(field, value)
+        pk = cache.get(alias)
+        if pk is not None:
+            row = cache.get(self.row_key(pk))
+            if row is not None:
+                obj = self.restore(row)
+                if getattr(obj, field) == value:
+                    return obj
+        obj = self.load(**{field: value})
+        cache.set_many({alias: obj.pk, self.row_key(obj.pk): self.dump(obj)},
+                       ROW_CACHE_TIMEOUT)
+        return obj
+
+    def invalidate(self, *pks):
+        keys = [self.row_key(pk) for pk in pks]
+        cache.delete_many(keys)
+        # Читатель мог положить в кэш строку до коммита записи.
+        transaction.on_commit(lambda: cache.delete_many(keys))
+
+    def _changed(self, sender, instance, **kwargs):
+        self.invalidate(instance.pk)
+
+
+class RowCacheManager(models.Manager):
+    """Менеджер с opt-in методом cached(field=value)."""
+
+    def contribute_to_class(self, model, name):
+        super().contribute_to_class(model, name)
+        if not model._meta.abstract:
+            self.rows = RowCache(model, manager=self)
+
+    def cached(self, **lookup):
+        return self.rows.cached(**lookup)
+
+    def invalidate(self, *pks):
+        self.rows.invalidate(*pks)
+
+
+def cached_or_404(manager, **lookup):
+    try:
+        return manager.cached(**lookup)
+    except manager.model.DoesNotExist:
+        raise Http404(f'No {manager.model._meta.object_name} matches '
+                      'the given query.')
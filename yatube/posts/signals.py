@@ -0,0 +1,238 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from core.page_cache import purge_pages
+
+from . import (comments, counters, feed_ids, follow_sets, fragments,
+               known_names, timeline)
+from .recent_posts import recent_posts
+from .models import AuthorStats, Comment, Follow, Group, Post, User
+
+
+def engine(name):
+    """Включён ли источник ленты подписок name (FOLLOW_FEED_ENGINE).
+
+    Поддерживается только включённый: другой не тратит записи на посты.
+    """
+    return settings.FOLLOW_FEED_ENGINE == name
+
+
+# Поля, которые выводятся на страницах и в карточках постов.
+USER_DISPLAY_FIELDS = ('username', 'first_name', 'last_name')
+GROUP_DISPLAY_FIELDS = ('title', 'slug')
+
+
+def display_changed(instance, fields, update_fields):
+    """Изменит ли сохранение instance поля fields."""
+    if instance.pk is None:
+        return True
+    if update_fields is not None:
+        return not set(update_fields).isdisjoint(fields)
+    old = type(instance).objects.filter(pk=instance.pk).values_list(
+        *fields).first()
+    return old != tuple(getattr(instance, field) for field in fields)
+
+
+@receiver(pre_save, sender=User)
+def user_changing(sender, instance, update_fields=None, **kwargs):
+    """Вход обновляет только last_login и кэши не трогает."""
+    instance._display_changed = display_changed(
+        instance, USER_DISPLAY_FIELDS, update_fields)
+
+
+@receiver(pre_save, sender=Group)
+def group_changing(sender, instance, update_fields=None, **kwargs):
+    instance._display_changed = display_changed(
+        instance, GROUP_DISPLAY_FIELDS, update_fields)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        AuthorStats.objects.create(author=instance)
+    if getattr(instance, '_display_changed', True):
+        known_names.usernames.add(instance.username)
+        if not created:
+            posts_changed(Post.objects.filter(author=instance))
+        purge_pages()
+
+
+@receiver(post_save, sender=Group)
+def group_saved(sender, instance, created, **kwargs):
+    known_names.group_slugs.add(instance.slug)
+    if not created and getattr(instance, '_display_changed', True):
+        posts_changed(Post.objects.filter(group=instance))
+    purge_pages()
+
+
+@receiver(post_delete, sender=Group)
+def group_deleted(sender, **kwargs):
+    purge_pages()
+
+
+def feeds_changed(feeds):
+    """Содержимое лент изменилось: сбрасываем их кэши."""
+    # Лента подписок не кэшируется фрагментами, её версии никто не читает.
+    fragments.bump_versions(
+        (feed, value) for feed, value in feeds if feed != counters.FOLLOW)
+    purge_pages()
+
+
+def posts_changed(posts):
+    """Карточки posts устарели: новая версия постов и их лент."""
+    rows = list(posts.values_list('pk', 'author_id', 'group_id'))
+    if not rows:
+        return
+    posts.update(version=F('version') + 1)
+    Post.objects.invalidate(*(pk for pk, _, _ in rows))
+    feeds = {(counters.INDEX, None)}
+    for _, author_id, group_id in rows:
+        feeds.add((counters.AUTHOR, author_id))
+        if group_id:
+            feeds.add((counters.GROUP, group_id))
+    feeds_changed(feeds)
+
+
+@receiver(pre_save, sender=Post)
+def post_moved(sender, instance, **kwargs):
+    """Смена группы или автора поста переносит его между лентами."""
+    if instance.pk is None:
+        return
+    old = Post.objects.only('group', 'author').filter(pk=instance.pk).first()
+    if old is None:
+        return
+    if (old.group_id, old.author_id) != (instance.group_id,
+                                         instance.author_id):
+        old_feeds = counters.post_feeds(old, follow=False)
+        moved = old_feeds + counters.post_feeds(instance, follow=False)
+        counters.reset_counts(moved)
+        feed_ids.reset(moved)
+        feeds_changed(old_feeds)
+        if old.author_id != instance.author_id:
+            counters.follow_feeds_changed()
+    if old.author_id != instance.author_id:
+        if engine('timeline'):
+            timeline.move(instance)
+            timeline.refill(old.author_id, exclude=instance.pk)
+        if engine('recent_posts'):
+            recent_posts.forget(old.author_id)
+            recent_posts.forget(instance.author_id)
+        AuthorStats.objects.change(old.author_id, posts=-1)
+        AuthorStats.objects.change(instance.author_id, posts=1)
+
+
+def written_feeds(post):
+    """Ленты нового или удалённого поста: (общие, ленты подписок).
+
+    Ленты подписок — только у автора с рассылкой, у остальных их кэши
+    сбрасывает смена поколения.
+    """
+    fans_out = timeline.fans_out(post.author_id)
+    if not fans_out:
+        counters.follow_feeds_changed()
+    feeds = counters.post_feeds(post, follow=fans_out)
+    return ([(feed, value) for feed, value in feeds
+             if feed != counters.FOLLOW],
+            [(feed, value) for feed, value in feeds
+             if feed == counters.FOLLOW])
+
+
+def reset_follow_feeds(feeds):
+    """Сбрасывает счётчики и списки id лент подписок одним delete_many.
+
+    Править кэш каждого подписчика в запросе — O(подписчиков) блокировок
+    и записей; порядок их лент и так хранит Timeline.
+    """
+    keys = [key(feed, value) for feed, value in feeds
+            for key in (counters.feed_count_key, feed_ids.ids_key)]
+    if not keys:
+        return
+    cache.delete_many(keys)
+    # Лента могла пересобраться до коммита поста.
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    if created:
+        feeds, follow_feeds = written_feeds(instance)
+        counters.change_counts(feeds, 1)
+        feed_ids.push(feeds, instance)
+        reset_follow_feeds(follow_feeds)
+        if engine('timeline'):
+            timeline.fan_out(instance, [value for _, value in follow_feeds])
+        if engine('recent_posts'):
+            recent_posts.push(instance)
+        AuthorStats.objects.change(instance.author_id, posts=1)
+    else:
+        # Правка не меняет состав лент.
+        feeds = counters.post_feeds(instance, follow=False)
+    feeds_changed(feeds)
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    feeds, follow_feeds = written_feeds(instance)
+    counters.change_counts(feeds, -1)
+    feed_ids.remove(feeds, instance)
+    reset_follow_feeds(follow_feeds)
+    if engine('timeline'):
+        timeline.refill(instance.author_id)
+    if engine('recent_posts'):
+        recent_posts.remove(instance)
+    AuthorStats.objects.change(instance.author_id, posts=-1)
+    feeds_changed(feeds)
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created, **kwargs):
+    counters.reset_counts([(counters.FOLLOW, instance.user_id)])
+    feed_ids.reset([(counters.FOLLOW, instance.user_id)])
+    purge_pages()
+    if created:
+        AuthorStats.objects.change(instance.author_id, followers=1)
+        AuthorStats.objects.change(instance.user_id, following=1)
+        # Флаг рассылки нужен и кэшам лент подписок, см. written_feeds.
+        timeline.stop_fan_out(instance.author_id)
+        if engine('timeline'):
+            timeline.backfill(instance.user_id, instance.author_id)
+        follow_sets.add(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    counters.reset_counts([(counters.FOLLOW, instance.user_id)])
+    feed_ids.reset([(counters.FOLLOW, instance.user_id)])
+    purge_pages()
+    AuthorStats.objects.change(instance.author_id, followers=-1)
+    AuthorStats.objects.change(instance.user_id, following=-1)
+    if engine('timeline'):
+        timeline.trim(instance.user_id, instance.author_id)
+    follow_sets.remove(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Comment)
+def comment_created(sender, instance, created, **kwargs):
+    if created:
+        AuthorStats.objects.change(instance.author_id, comments=1)
+        Post.objects.filter(pk=instance.post_id).update(
+            comment_count=F('comment_count') + 1, version=F('version') + 1)
+        Post.objects.invalidate(instance.post_id)
+        comments.push_comment_preview(instance)
+        feeds_changed(counters.post_feeds(instance.post, follow=False))
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    AuthorStats.objects.change(instance.author_id, comments=-1)
+    Post.objects.filter(pk=instance.post_id).update(
+        comment_count=F('comment_count') - 1, version=F('version') + 1)
+    Post.objects.invalidate(instance.post_id)
+    cache.delete(comments.preview_key(instance.post_id))
+    post = Post.objects.filter(pk=instance.post_id).first()
+    if post is not None:
+        feeds_changed(counters.post_feeds(post, follow=False))
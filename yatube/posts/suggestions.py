@@ -0,0 +1,195 @@
+"""Рекомендации «на кого подписаться»: авторы подписок читателя.
+
+Граф Follow снимается в CSR: indptr[u]:indptr[u + 1] — срез indices с
+id авторов, на которых подписан u, строки идут по id пользователя.
+Рекомендации — строки произведения A·A без уже известных подписок и
+самого читателя: кандидат получает по баллу за каждую подписку
+читателя, которая подписана на него. Произведение считается numpy по
+пачкам строк, объём пачки ограничен SUGGESTIONS_MAX_PAIRS парами.
+
+Снимок и матрица рекомендаций (строка = id пользователя, нули —
+пустые места) лежат в SUGGESTIONS_ROOT как .npy и читаются через
+memmap: поиск по пользователю — одна строка массива. Инкрементальное
+обновление пересчитывает только тех, у кого изменились подписки, и
+их подписчиков.
+"""
+import os
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .constants import SUGGESTIONS_MAX_PAIRS, SUGGESTIONS_STORED
+from .models import Follow, User
+
+INDPTR = 'indptr'
+INDICES = 'indices'
+SUGGESTIONS = 'suggestions'
+
+
+def to_csr(users, authors, rows):
+    """CSR (indptr, indices) из пар (users[i], authors[i])."""
+    order = np.lexsort((authors, users))
+    indptr = np.zeros(rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(users, minlength=rows), out=indptr[1:])
+    return indptr, authors[order].astype(np.int32)
+
+
+def row_ids(indptr):
+    """Номер строки для каждого элемента indices."""
+    return np.repeat(np.arange(len(indptr) - 1, dtype=np.int64),
+                     np.diff(indptr))
+
+
+def ranges(starts, lengths):
+    """Конкатенация arange(start, start + length) без цикла."""
+    offsets = np.cumsum(lengths) - lengths
+    return np.repeat(starts - offsets, lengths) + np.arange(lengths.sum())
+
+
+def batches(indptr, indices, users):
+    """Пачки users, у которых A·A даёт не больше SUGGESTIONS_MAX_PAIRS пар.
+
+    Пользователь с большим объёмом идёт отдельной пачкой.
+    """
+    degrees = np.diff(indptr)
+    work = np.zeros(len(indptr) - 1, dtype=np.int64)
+    rows = row_ids(indptr)
+    np.add.at(work, rows, degrees[indices])
+    total = np.cumsum(work[users])
+    bounds = np.searchsorted(
+        total, np.arange(SUGGESTIONS_MAX_PAIRS, total[-1] if len(total)
+                         else 0, SUGGESTIONS_MAX_PAIRS), side='right')
+    return np.split(users, np.unique(bounds))
+
+
+def top_k(indptr, indices, users, k=SUGGESTIONS_STORED):
+    """Матрица (len(users), k) лучших кандидатов для строк users."""
+    users = np.asarray(users, dtype=np.int64)
+    result = np.zeros((len(users), k), dtype=np.int32)
+    degrees = np.diff(indptr)
+    width = np.int64(max(len(indptr) - 1, 1))
+    done = 0
+    for batch in batches(indptr, indices, users):
+        local = np.arange(len(batch))
+        # Первый шаг: подписки читателей пачки.
+        first = np.repeat(local, degrees[batch])
+        middle = indices[ranges(indptr[batch], degrees[batch])]
+        # Второй шаг: подписки этих авторов — кандидаты.
+        second = np.repeat(first, degrees[middle])
+        candidates = indices[ranges(indptr[middle], degrees[middle])]
+        keys = second * width + candidates
+        known = first * width + middle
+        keep = ~np.isin(keys, known) & (candidates != batch[second])
+        keys, scores = np.unique(keys[keep], return_counts=True)
+        rows, candidates = keys // width, keys % width
+        # Внутри строки: больше баллов, затем меньший id.
+        order = np.lexsort((candidates, -scores, rows))
+        rows, candidates = rows[order], candidates[order]
+        starts = np.searchsorted(rows, rows)
+        rank = np.arange(len(rows)) - starts
+        top = rank < k
+        result[done + rows[top], rank[top]] = candidates[top]
+        done += len(batch)
+    return result
+
+
+def changed_users(old_indptr, old_indices, indptr, indices):
+    """Пользователи, у которых набор подписок отличается."""
+    width = np.int64(max(len(old_indptr), len(indptr)))
+    old = row_ids(old_indptr) * width + old_indices
+    new = row_ids(indptr) * width + indices
+    return np.unique(np.setxor1d(old, new, assume_unique=True) // width)
+
+
+def affected_users(old_indptr, old_indices, indptr, indices):
+    """Чьи рекомендации могли измениться: сменившие подписки и их читатели."""
+    changed = changed_users(old_indptr, old_indices, indptr, indices)
+    followers = row_ids(indptr)[np.isin(indices, changed)]
+    return np.union1d(changed, followers)
+
+
+def snapshot():
+    """CSR графа Follow из БД.
+
+    Рёбра читаются одним запросом, строк хватает на все id из рёбер:
+    пользователь мог появиться между запросами.
+    """
+    with transaction.atomic():
+        last = User.objects.order_by('-pk').values_list(
+            'pk', flat=True).first() or 0
+        edges = np.fromiter(
+            (pk for pair in Follow.objects.values_list(
+                'user_id', 'author_id').iterator() for pk in pair),
+            dtype=np.int64).reshape(-1, 2)
+    rows = max(last, int(edges.max()) if len(edges) else 0) + 1
+    return to_csr(edges[:, 0], edges[:, 1], rows)
+
+
+class SuggestionStore:
+    """Файлы .npy в SUGGESTIONS_ROOT и memmap матрицы для чтения."""
+
+    def __init__(self):
+        self.matrix = None
+        self.stamp = None
+
+    @property
+    def root(self):
+        return settings.SUGGESTIONS_ROOT
+
+    def path(self, name):
+        return os.path.join(self.root, f'{name}.npy')
+
+    def load(self, name):
+        path = self.path(name)
+        if not os.path.exists(path):
+            return None
+        return np.load(path, mmap_mode='r')
+
+    def save(self, name, array):
+        """Запись через rename: открытые memmap дочитают старый файл."""
+        os.makedirs(self.root, exist_ok=True)
+        tmp = self.path(f'{name}.tmp')
+        np.save(tmp, array)
+        os.replace(tmp, self.path(name))
+
+    def build(self, incremental=False):
+        """Пересчитывает рекомендации; возвращает число пересчитанных."""
+        indptr, indices = snapshot()
+        rows = len(indptr) - 1
+        old_indptr, old_indices = self.load(INDPTR), self.load(INDICES)
+        old = self.load(SUGGESTIONS)
+        if incremental and old is not None and old_indptr is not None:
+            users = affected_users(old_indptr, old_indices, indptr, indices)
+            matrix = np.zeros((rows, old.shape[1]), dtype=np.int32)
+            kept = min(rows, len(old))
+            matrix[:kept] = old[:kept]
+        else:
+            users = np.flatnonzero(np.diff(indptr))
+            matrix = np.zeros((rows, SUGGESTIONS_STORED), dtype=np.int32)
+        users = users[users < rows]
+        matrix[users] = top_k(indptr, indices, users, matrix.shape[1])
+        self.save(INDPTR, indptr)
+        self.save(INDICES, indices)
+        self.save(SUGGESTIONS, matrix)
+        return len(users)
+
+    def suggestions(self):
+        """memmap матрицы; файл перечитывается, если его заменили."""
+        try:
+            stamp = os.stat(self.path(SUGGESTIONS)).st_mtime_ns
+        except FileNotFoundError:
+            return None
+        if stamp != self.stamp:
+            self.matrix, self.stamp = self.load(SUGGESTIONS), stamp
+        return self.matrix
+
+    def for_user(self, user_id):
+        """id рекомендованных авторов, лучшие первыми."""
+        matrix = self.suggestions()
+        if matrix is None or user_id >= len(matrix):
+            return []
+        return [pk for pk in matrix[user_id].tolist() if pk]
+
+
+store = SuggestionStore()
@@ -0,0 +1,106 @@
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, fragments
+from ..models import Comment, Follow, Group, Post
+
+
+class FeedCounterTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.follower = User.objects.create_user(username='follower')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        Follow.objects.create(user=cls.follower, author=cls.author)
+        Post.objects.bulk_create(
+            Post(author=cls.author, group=cls.group, text=f'Пост {i}')
+            for i in range(12)
+        )
+
+    def setUp(self):
+        cache.clear()
+
+    def get_count(self, feed, value=None):
+        return cache.get(counters.feed_count_key(feed, value))
+
+    def test_count_query_runs_once(self):
+        """Повторный просмотр профиля не выполняет COUNT."""
+        url = reverse('posts:profile', kwargs={'username': 'author'})
+        self.client.force_login(self.follower)
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.context['page_obj'].paginator.count, 12)
+        self.assertFalse(any(
+            'COUNT(' in query['sql'] and 'FROM "posts_post"' in query['sql']
+            for query in queries.captured_queries))
+
+    def test_counts_follow_post_writes(self):
+        """Создание и удаление поста меняют счётчики его общих лент."""
+        feeds = ((counters.INDEX, None),
+                 (counters.GROUP, self.group.pk),
+                 (counters.AUTHOR, self.author.pk))
+        follow_feed = (counters.FOLLOW, self.follower.pk)
+        for feed, value in feeds + (follow_feed,):
+            counters.FeedCounter(feed, value)(Post.objects.all())
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Новый пост')
+        for feed, value in feeds:
+            with self.subTest(feed=feed):
+                self.assertEqual(self.get_count(feed, value), 13)
+        # Счётчики лент подписок сбрасываются, а не правятся.
+        self.assertIsNone(self.get_count(*follow_feed))
+        post.delete()
+        for feed, value in feeds:
+            with self.subTest(feed=feed):
+                self.assertEqual(self.get_count(feed, value), 12)
+
+    def test_follow_resets_follow_feed_count(self):
+        """Подписка сбрасывает счётчик ленты подписок."""
+        counters.FeedCounter(counters.FOLLOW, self.author.pk)(
+            Post.objects.none())
+        Follow.objects.create(user=self.author, author=self.follower)
+        self.assertIsNone(self.get_count(counters.FOLLOW, self.author.pk))
+
+    def test_large_feed_is_estimated(self):
+        """Выше порога COUNT заменяется оценкой по выборке."""
+        with mock.patch.object(counters, 'COUNT_ESTIMATE_THRESHOLD', 5):
+            count = counters.FeedCounter(counters.INDEX)(Post.objects.all())
+        self.assertAlmostEqual(count, 12, delta=1)
+
+    def test_comment_skips_follow_feeds(self):
+        """Комментарий не читает подписчиков и не трогает версии их лент."""
+        post = Post.objects.filter(author=self.author).first()
+        versions = {feed: fragments.feed_version(*feed) for feed in (
+            (counters.AUTHOR, self.author.pk),
+            (counters.FOLLOW, self.follower.pk))}
+        with CaptureQueriesContext(connection) as queries:
+            Comment.objects.create(post=post, author=self.follower,
+                                   text='Комментарий')
+        self.assertFalse(any('"posts_follow"' in query['sql']
+                             for query in queries.captured_queries))
+        self.assertEqual(
+            fragments.feed_version(counters.AUTHOR, self.author.pk),
+            versions[counters.AUTHOR, self.author.pk] + 1)
+        self.assertEqual(
+            fragments.feed_version(counters.FOLLOW, self.follower.pk),
+            versions[counters.FOLLOW, self.follower.pk])
+
+    def test_versions_bumped_again_after_commit(self):
+        """Фрагмент, отрисованный до коммита, после него устаревает."""
+        feed = (counters.AUTHOR, self.author.pk)
+        version = fragments.feed_version(*feed)
+        callbacks = []
+        with mock.patch('posts.fragments.transaction.on_commit',
+                        callbacks.append):
+            Post.objects.create(author=self.author, text='Свежий пост')
+        self.assertEqual(fragments.feed_version(*feed), version + 1)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(fragments.feed_version(*feed), version + 2)
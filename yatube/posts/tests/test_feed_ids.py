@@ -0,0 +1,63 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .. import counters, feed_ids
+from ..models import Group, Post, User
+
+
+class FeedIdsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        for i in range(15):
+            Post.objects.create(author=cls.author, group=cls.group,
+                                text=f'Пост {i}')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def get_ids(self, feed, value=None):
+        return cache.get(feed_ids.ids_key(feed, value))
+
+    def test_pages_hydrated_from_ids(self):
+        """Страницы собираются по списку id без OFFSET и COUNT."""
+        url = reverse('posts:group_list', kwargs={'slug': 'group'})
+        first = self.client.get(url).context['page_obj']
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(url + '?page=2').context['page_obj']
+            after = self.client.get(url + '?after=' + first.next_cursor)
+        posts = [query['sql'] for query in queries.captured_queries
+                 if 'FROM "posts_post"' in query['sql']]
+        self.assertEqual(len(posts), 2)
+        self.assertTrue(all('IN (' in sql and 'OFFSET' not in sql
+                            and 'COUNT(' not in sql for sql in posts))
+        expected = list(Post.objects.order_by('-pub_date')[10:])
+        self.assertEqual(list(second), expected)
+        self.assertEqual(list(after.context['page_obj']), expected)
+
+    def test_writes_update_lists(self):
+        """Новый пост попадает в начало списков, удалённый — исчезает."""
+        self.client.get(reverse('posts:index'))
+        post = Post.objects.create(author=self.author, group=self.group,
+                                   text='Новый')
+        complete, ids = self.get_ids(counters.INDEX)
+        self.assertTrue(complete)
+        self.assertEqual((len(ids), ids[0]), (16, post.pk))
+        post.delete()
+        self.assertNotIn(post.pk, self.get_ids(counters.INDEX)[1])
+
+    def test_truncated_list_falls_back_to_queries(self):
+        """Страницы за пределами короткого списка берутся из БД."""
+        with mock.patch.object(feed_ids, 'FEED_IDS_LIMIT', 5):
+            page = self.client.get(
+                reverse('posts:index') + '?page=2').context['page_obj']
+        self.assertEqual(page.paginator.count, 15)
+        self.assertEqual(list(page),
+                         list(Post.objects.order_by('-pub_date')[10:]))
@@ -0,0 +1,54 @@
+from array import array
+
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from ..follow_sets import FollowSet, follow_set, follow_set_key
+from ..models import Follow, User
+
+
+class FollowSetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(4)]
+        for author in cls.authors[:3]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_membership(self):
+        follows = FollowSet(array('I', [2, 5, 9]))
+        self.assertEqual([pk in follows for pk in (1, 2, 5, 6, 9, 10)],
+                         [False, True, True, False, True, False])
+
+    def test_compact_cache(self):
+        follows = follow_set(self.reader.pk)
+        self.assertEqual(list(follows),
+                         sorted(author.pk for author in self.authors[:3]))
+        self.assertEqual(len(cache.get(follow_set_key(self.reader.pk))),
+                         3 * array('I').itemsize)
+
+    def test_follow_views_update_set(self):
+        """Подписка и отписка правят массив без его перечитывания."""
+        follow_set(self.reader.pk)
+        author = self.authors[3]
+        self.client.get(
+            reverse('posts:profile_follow', args=[author.username]))
+        with self.assertNumQueries(0):
+            self.assertIn(author.pk, follow_set(self.reader.pk))
+        self.client.get(
+            reverse('posts:profile_unfollow', args=[author.username]))
+        with self.assertNumQueries(0):
+            self.assertNotIn(author.pk, follow_set(self.reader.pk))
+
+    def test_profile_reads_set(self):
+        author = self.authors[0]
+        follow_set(self.reader.pk)
+        response = self.client.get(
+            reverse('posts:profile', args=[author.username]))
+        self.assertTrue(response.context['following'])
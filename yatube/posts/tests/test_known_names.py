@@ -0,0 +1,69 @@
+from django.core.cache import cache
+from django.test import TestCase
+from django.urls import reverse
+
+from .. import known_names
+from ..models import Group, User
+
+
+class KnownNamesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+
+    def setUp(self):
+        cache.clear()
+
+    def test_unknown_names_answered_without_queries(self):
+        """Несуществующие автор и группа — 404 без запросов к БД."""
+        urls = (reverse('posts:profile', args=['nobody']),
+                reverse('posts:group_list', args=['no-such-group']))
+        for url in urls:
+            # Первый запрос процесса строит фильтр.
+            self.client.get(url)
+            with self.subTest(url=url), self.assertNumQueries(0):
+                response = self.client.get(url)
+                self.assertContains(response, 'Custom 404', status_code=404)
+                self.assertContains(response, url, status_code=404)
+
+    def test_new_names_found(self):
+        """Новые пользователь и группа сразу доступны."""
+        self.client.get(reverse('posts:profile', args=['author']))
+        User.objects.create_user(username='newcomer')
+        Group.objects.create(title='Новая', slug='new', description='-')
+        urls = (reverse('posts:profile', args=['newcomer']),
+                reverse('posts:group_list', args=['new']))
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_generation_changes_after_commit(self):
+        """До коммита поколение не меняется: другие процессы ждут его."""
+        self.client.get(reverse('posts:profile', args=['author']))
+        generation = known_names.usernames.current_generation()
+        User.objects.create_user(username='newcomer')
+        self.assertEqual(known_names.usernames.current_generation(),
+                         generation)
+        self.assertTrue(known_names.usernames.might_exist('newcomer'))
+
+    def test_other_process_catches_up_without_rebuild(self):
+        """Чужое новое значение дописывается в фильтр без запроса к БД."""
+        names = known_names.usernames
+        names.might_exist('author')
+        other = known_names.KnownNames(names.name, names.load)
+        other.publish('newcomer')
+        with self.assertNumQueries(0):
+            self.assertTrue(names.might_exist('newcomer'))
+        self.assertEqual(names.generation, names.current_generation())
+
+    def test_evicted_values_rebuild_filter(self):
+        """Без значений пропущенных поколений фильтр строится из БД."""
+        names = known_names.usernames
+        names.might_exist('author')
+        other = known_names.KnownNames(names.name, names.load)
+        other.publish('newcomer')
+        cache.delete(names.added_key(names.current_generation()))
+        with self.assertNumQueries(1):
+            names.might_exist('newcomer')
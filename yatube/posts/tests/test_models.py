@@ -1,8 +1,11 @@
+import os
+
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.test import TestCase
 
 from ..constants import ADM_TOOL_TEXT_LIM
-from ..models import Group, Post, Follow, Comment
+from ..models import AuthorStats, Group, Post, Follow, Comment
 
 
 class PostModelTest(TestCase):
@@ -121,3 +124,37 @@ class CommentModelTest(TestCase):
             with self.subTest(value=value):
                 verbose_name = self.comment._meta.get_field(value).verbose_name
                 self.assertEqual(verbose_name, expected)
+
+
+class AuthorStatsModelTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        Post.objects.create(text='Ещё пост', author=cls.author)
+        Comment.objects.create(text='Коммент', author=cls.reader,
+                               post=cls.post)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def get_stats(self, user):
+        stats = AuthorStats.objects.get(author=user)
+        return (stats.posts, stats.followers, stats.following,
+                stats.comments)
+
+    def test_stats_follow_writes(self):
+        """Статистика обновляется при записи постов, подписок, комментов."""
+        self.assertEqual(self.get_stats(self.author), (2, 1, 0, 0))
+        self.assertEqual(self.get_stats(self.reader), (0, 0, 1, 1))
+        self.post.delete()
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.get_stats(self.author), (1, 0, 0, 0))
+        self.assertEqual(self.get_stats(self.reader), (0, 0, 0, 0))
+
+    def test_rebuild_command(self):
+        """rebuild_author_stats восстанавливает испорченные счётчики."""
+        AuthorStats.objects.update(posts=100, followers=0)
+        AuthorStats.objects.filter(author=self.reader).delete()
+        call_command('rebuild_author_stats', stdout=open(os.devnull, 'w'))
+        self.assertEqual(self.get_stats(self.author), (2, 1, 0, 0))
+        self.assertEqual(self.get_stats(self.reader), (0, 0, 1, 1))
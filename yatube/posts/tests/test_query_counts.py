@@ -0,0 +1,69 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from ..models import Comment, Follow, Group, Post, User
+
+
+class QueryCountTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.groups = [Group.objects.create(title=f'Группа {i}', slug=f'g{i}')
+                      for i in range(2)]
+        cls.post = Post.objects.create(author=cls.reader, text='Пост')
+        # Пост с комментариями всегда на первой странице ленты.
+        Post.objects.filter(pk=cls.post.pk).update(
+            pub_date=timezone.now() + timedelta(days=1))
+        cls.add_authors(3)
+
+    @classmethod
+    def add_authors(cls, count):
+        """Ещё count авторов с постами, комментариями и подписчиком."""
+        start = User.objects.count()
+        for i in range(start, start + count):
+            author = User.objects.create_user(username=f'author{i}')
+            for group in cls.groups:
+                Post.objects.create(author=author, group=group, text='Пост')
+            Comment.objects.create(post=cls.post, author=author, text='Да')
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        self.client.force_login(self.reader)
+
+    def count_queries(self):
+        urls = {
+            'index': reverse('posts:index'),
+            'group': reverse('posts:group_list', args=['g0']),
+            'profile': reverse('posts:profile', args=['author1']),
+            'follow': reverse('posts:follow_index'),
+            'detail': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+        counts = {}
+        for name, url in urls.items():
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(url)
+            counts[name] = len(queries.captured_queries)
+        return counts
+
+    def test_query_budget(self):
+        """Холодный рендер страниц укладывается в бюджет запросов.
+
+        Сессия и пользователь — 2 запроса; после cache.clear() группа и
+        профиль ещё пересобирают Bloom-фильтр имён.
+        """
+        self.assertEqual(self.count_queries(), {
+            'index': 5, 'group': 6, 'profile': 8, 'follow': 5, 'detail': 6,
+        })
+
+    def test_queries_do_not_grow_with_page(self):
+        """Число запросов не растёт с числом авторов и комментариев."""
+        before = self.count_queries()
+        self.add_authors(5)
+        self.assertEqual(self.count_queries(), before)
@@ -0,0 +1,45 @@
+import io
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from posts.models import Comment, Group, Post
+from posts.query_plans import (FULL_SCAN, TEMP_SORT, explain, has_index,
+                               problems, recommend, view_querysets)
+
+
+class QueryPlansTest(TestCase):
+    def test_problems(self):
+        """Полный скан и временная сортировка попадают в список проблем."""
+        self.assertEqual(problems([
+            'SCAN posts_post',
+            'SCAN posts_post USING COVERING INDEX post_pub_date_idx',
+            'USE TEMP B-TREE FOR ORDER BY',
+        ]), [f'{FULL_SCAN}: SCAN posts_post',
+             f'{TEMP_SORT}: USE TEMP B-TREE FOR ORDER BY'])
+
+    def test_recommend(self):
+        """Индекс — поля равенства, затем поля сортировки без pk."""
+        group = Group(pk=1)
+        self.assertEqual(
+            recommend(group.posts.order_by('-pub_date', '-pk')),
+            ('group', 'pub_date'))
+        self.assertEqual(
+            recommend(Comment.objects.filter(post_id=1)),
+            ('post', 'created'))
+        self.assertEqual(recommend(Post.objects.order_by()), ())
+
+    def test_feeds_use_indexes(self):
+        """Ленты, кроме подписок, не сортируют и не сканируют таблицу."""
+        for name, queryset in view_querysets():
+            if name.startswith('follow_index'):
+                continue
+            with self.subTest(name=name):
+                self.assertEqual(problems(explain(queryset)), [])
+
+    def test_advisor_has_nothing_to_add(self):
+        """index_advisor --check проходит на текущих индексах."""
+        self.assertTrue(has_index(Post, ('author', 'pub_date')))
+        out = io.StringIO()
+        call_command('index_advisor', '--check', stdout=out)
+        self.assertIn('Новых индексов не нужно', out.getvalue())
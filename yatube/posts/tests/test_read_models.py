@@ -0,0 +1,63 @@
+import shutil
+import tempfile
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Group, Post, User
+from ..read_models import AuthorRow, PostRow
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+SMALL_GIF = (b'\x47\x49\x46\x38\x39\x61\x01\x00\x01\x00\x00\x00\x00\x21'
+             b'\xf9\x04\x01\x00\x00\x00\x00\x2c\x00\x00\x00\x00\x01\x00'
+             b'\x01\x00\x00\x02\x01\x00\x00\x3b')
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT)
+class ReadModelsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(
+            username='author', first_name='Лев', last_name='Толстой')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(
+            author=cls.author, group=cls.group, text='С картинкой',
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'))
+        Post.objects.create(author=cls.author, text='Без группы')
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.author)
+
+    def test_feed_rows(self):
+        """Строки ленты несут готовые URL и равны своим моделям."""
+        rows = list(Post.objects.feed_rows().order_by('pk'))
+        self.assertIsInstance(rows[0], PostRow)
+        self.assertIsInstance(rows[0].author, AuthorRow)
+        self.assertIs(rows[0].author, rows[1].author)
+        self.assertIsNone(rows[1].group)
+        self.assertEqual(rows[0], self.post)
+        self.assertEqual(rows[0].author, self.author)
+        self.assertEqual(rows[0].group, self.group)
+        self.assertEqual(rows[0].author.full_name, 'Лев Толстой')
+        self.assertEqual(rows[0].url, reverse(
+            'posts:post_detail', kwargs={'post_id': self.post.pk}))
+        with self.assertRaises(AttributeError):
+            rows[0].extra = 1
+
+    def test_cards_rendered_from_rows(self):
+        """Карточки ленты строятся по строкам, с миниатюрой и ссылками."""
+        response = self.client.get(reverse('posts:index'))
+        self.assertIsInstance(response.context['page_obj'][0], PostRow)
+        self.assertContains(response, '<img class="card-img')
+        self.assertContains(response, 'Автор: Лев Толстой')
+        self.assertContains(
+            response, reverse('posts:group_list', kwargs={'slug': 'group'}))
@@ -0,0 +1,71 @@
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from ..models import Follow, Post, User
+from ..recent_posts import RecentPosts, recent_posts
+
+
+class RecentPostsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader = User.objects.create_user(username='reader')
+        cls.authors = [User.objects.create_user(username=f'author{i}')
+                       for i in range(3)]
+        for i in range(9):
+            Post.objects.create(author=cls.authors[i % 3], text=f'Пост {i}')
+        for author in cls.authors[:2]:
+            Follow.objects.create(user=cls.reader, author=author)
+
+    def setUp(self):
+        cache.clear()
+
+    def expected(self, authors):
+        return list(Post.objects.filter(author__in=authors).order_by(
+            '-pub_date', '-pk').values_list('pk', flat=True))
+
+    def test_merge(self):
+        ids = [author.pk for author in self.authors]
+        self.assertEqual(RecentPosts().feed_ids(ids),
+                         (True, self.expected(self.authors)))
+
+    def test_truncated_buffers_limit_merge(self):
+        """Слияние не заходит за хвост обрезанного буфера."""
+        complete, ids = RecentPosts(size=2).feed_ids(
+            [author.pk for author in self.authors])
+        self.assertFalse(complete)
+        self.assertEqual(ids, self.expected(self.authors)[:4])
+
+    def test_buffers_bounded(self):
+        """Буферов не больше max_authors, вытесняются давно не читавшиеся."""
+        buffers = RecentPosts(max_authors=2)
+        first, second, third = (author.pk for author in self.authors)
+        buffers.feed_ids([first, second])
+        buffers.feed_ids([first])
+        buffers.feed_ids([third])
+        self.assertEqual(list(buffers.buffers), [first, third])
+
+    @override_settings(FOLLOW_FEED_ENGINE='recent_posts')
+    def test_writes_update_buffers(self):
+        author = self.authors[0]
+        recent_posts.feed_ids([author.pk])
+        post = Post.objects.create(author=author, text='Новый')
+        self.assertEqual(recent_posts.buffers[author.pk][1][1][0][1], post.pk)
+        post.delete()
+        self.assertEqual(recent_posts.feed_ids([author.pk]),
+                         (True, self.expected([author])))
+
+    def test_other_engine_not_maintained(self):
+        """С лентой из Timeline посты не трогают буферы и поколения."""
+        author = self.authors[0]
+        recent_posts.feed_ids([author.pk])
+        generation = recent_posts.generations([author.pk])
+        Post.objects.create(author=author, text='Новый')
+        self.assertEqual(recent_posts.generations([author.pk]), generation)
+
+    @override_settings(FOLLOW_FEED_ENGINE='recent_posts')
+    def test_follow_index(self):
+        self.client.force_login(self.reader)
+        page = self.client.get(reverse('posts:follow_index'))
+        self.assertEqual([post.pk for post in page.context['page_obj']],
+                         self.expected(self.authors[:2]))
@@ -0,0 +1,62 @@
+from django.core.cache import cache
+from django.test import TestCase
+
+from ..models import AuthorStats, Comment, Group, Post, User, user_rows
+
+
+class RowCacheTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group',
+                                         description='Описание')
+        cls.post = Post.objects.create(author=cls.author, text='Пост',
+                                       group=cls.group)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_lookups_cached(self):
+        """Повторный поиск по slug, username и pk не ходит в БД."""
+        lookups = ((Group.objects, {'slug': 'group'}),
+                   (user_rows, {'username': 'author'}),
+                   (Post.objects, {'pk': self.post.pk}))
+        for manager, lookup in lookups:
+            with self.subTest(lookup=lookup):
+                obj = manager.cached(**lookup)
+                with self.assertNumQueries(0):
+                    self.assertEqual(manager.cached(**lookup), obj)
+
+    def test_user_row_keeps_displayed_fields(self):
+        """В кэше пользователя только выводимые поля, без пароля."""
+        user_rows.cached(username='author')
+        row = cache.get(user_rows.row_key(self.author.pk))
+        self.assertEqual(row, (self.author.pk, 'author', '', ''))
+        with self.assertNumQueries(0):
+            author = user_rows.cached(pk=self.author.pk)
+        self.assertEqual(author, self.author)
+
+    def test_rename_and_delete_invalidate(self):
+        """После переименования старый slug не находит группу."""
+        Group.objects.cached(slug='group')
+        group = Group.objects.get(pk=self.group.pk)
+        group.slug = 'renamed'
+        group.save()
+        with self.assertRaises(Group.DoesNotExist):
+            Group.objects.cached(slug='group')
+        self.assertEqual(Group.objects.cached(slug='renamed').slug,
+                         'renamed')
+        group.delete()
+        with self.assertRaises(Group.DoesNotExist):
+            Group.objects.cached(slug='renamed')
+
+    def test_counter_updates_invalidate(self):
+        """Счётчики, обновляемые через update(), не залипают в кэше."""
+        AuthorStats.objects.cached(pk=self.author.pk)
+        Post.objects.cached(pk=self.post.pk)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Комментарий')
+        self.assertEqual(
+            AuthorStats.objects.cached(pk=self.author.pk).comments, 1)
+        self.assertEqual(
+            Post.objects.cached(pk=self.post.pk).comment_count, 1)
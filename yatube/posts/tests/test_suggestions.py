@@ -0,0 +1,84 @@
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+import numpy as np
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import suggestions
+from ..models import Follow, User
+
+SUGGESTIONS_ROOT = tempfile.mkdtemp()
+
+
+@override_settings(SUGGESTIONS_ROOT=SUGGESTIONS_ROOT)
+class SuggestionsTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.b, cls.c, cls.d, cls.e = (
+            User.objects.create_user(username=name)
+            for name in ('reader', 'b', 'c', 'd', 'e'))
+        for user, author in ((cls.reader, cls.b), (cls.reader, cls.c),
+                             (cls.b, cls.d), (cls.c, cls.d),
+                             (cls.c, cls.e), (cls.b, cls.reader)):
+            Follow.objects.create(user=user, author=author)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(SUGGESTIONS_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def test_friends_of_friends(self):
+        """Кандидаты по числу общих подписок, без подписок и себя."""
+        indptr, indices = suggestions.snapshot()
+        top = suggestions.top_k(indptr, indices, [self.reader.pk], 3)
+        self.assertEqual(top.tolist(), [[self.d.pk, self.e.pk, 0]])
+
+    def test_batches_cover_users(self):
+        """Пачки по SUGGESTIONS_MAX_PAIRS дают ту же матрицу, что и одна."""
+        indptr, indices = suggestions.snapshot()
+        users = np.arange(len(indptr) - 1)
+        full = suggestions.top_k(indptr, indices, users)
+        with mock.patch.object(suggestions, 'SUGGESTIONS_MAX_PAIRS', 1):
+            batched = suggestions.top_k(indptr, indices, users)
+        self.assertEqual(batched.tolist(), full.tolist())
+
+    def test_incremental_matches_full(self):
+        """Инкрементальный пересчёт совпадает с полным."""
+        store = suggestions.SuggestionStore()
+        store.build()
+        Follow.objects.create(user=self.d, author=self.e)
+        Follow.objects.filter(user=self.c, author=self.e).delete()
+        late = User.objects.create_user(username='late')
+        Follow.objects.create(user=late, author=self.b)
+        store.build(incremental=True)
+        incremental = np.array(store.suggestions())
+        store.build()
+        self.assertEqual(incremental.tolist(),
+                         np.array(store.suggestions()).tolist())
+        # Равные баллы: первым меньший id.
+        self.assertEqual(store.for_user(late.pk),
+                         [self.reader.pk, self.d.pk])
+
+    def test_pages_show_suggestions(self):
+        """Лента подписок и профиль показывают ещё не подписанных авторов."""
+        call_command('build_suggestions', stdout=io.StringIO())
+        for url in (reverse('posts:follow_index'),
+                    reverse('posts:profile', args=[self.b.username])):
+            with self.subTest(url=url):
+                response = self.client.get(url)
+                self.assertContains(
+                    response, reverse('posts:profile', args=['d']))
+        Follow.objects.create(user=self.reader, author=self.d)
+        response = self.client.get(reverse('posts:follow_index'))
+        self.assertNotContains(
+            response, reverse('posts:profile', args=['d']))
+        self.assertContains(response, reverse('posts:profile', args=['e']))
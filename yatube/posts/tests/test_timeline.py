@@ -0,0 +1,100 @@
+import io
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from .. import counters, feed_ids, timeline
+from ..models import AuthorStats, Follow, Post, Timeline, User
+
+
+class TimelineTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.reader = User.objects.create_user(username='reader')
+        cls.old = Post.objects.create(author=cls.author, text='Старый')
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.reader)
+
+    def follow_page(self):
+        return list(self.client.get(
+            reverse('posts:follow_index')).context['page_obj'])
+
+    def timeline(self):
+        return set(Timeline.objects.filter(
+            user=self.reader).values_list('post_id', flat=True))
+
+    def test_follow_backfills_and_unfollow_trims(self):
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.timeline(), {self.old.pk, post.pk})
+        self.assertEqual(self.follow_page(), [post, self.old])
+        Follow.objects.filter(user=self.reader).delete()
+        self.assertEqual(self.timeline(), set())
+        self.assertEqual(self.follow_page(), [])
+
+    @mock.patch('posts.timeline.TIMELINE_BACKFILL_LIMIT', 3)
+    @mock.patch('posts.timeline.FEED_IDS_LIMIT', 2)
+    @mock.patch('posts.feed_ids.FEED_IDS_LIMIT', 2)
+    def test_backfill_capped_to_latest_posts(self):
+        """Подписка пишет в Timeline только последние посты автора."""
+        posts = [Post.objects.create(author=self.author, text=f'Пост {i}')
+                 for i in range(4)]
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(self.timeline(), {post.pk for post in posts[1:]})
+        # Страница глубже списка id собирается JOIN по подпискам.
+        self.assertEqual(self.follow_page(), posts[::-1] + [self.old])
+        posts[-1].delete()
+        self.assertEqual(self.timeline(), {post.pk for post in posts[:3]})
+
+    @override_settings(FOLLOW_FEED_ENGINE='recent_posts')
+    def test_rebuild_after_other_engine(self):
+        """Таблицу, которая не велась, заполняет rebuild_timelines."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.timeline(), set())
+        call_command('rebuild_timelines', stdout=io.StringIO())
+        self.assertEqual(self.timeline(), {self.old.pk, post.pk})
+
+    def test_popular_author_merged_on_read(self):
+        """Автора с TIMELINE_FANOUT_LIMIT подписчиков читают без рассылки."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'TIMELINE_FANOUT_LIMIT', 1):
+            timeline.stop_fan_out(self.author.pk)
+        self.assertFalse(AuthorStats.objects.get(author=self.author).fan_out)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(self.timeline(), {self.old.pk})
+        # Старый пост есть и в Timeline, и среди постов автора.
+        self.assertEqual(self.follow_page(), [post, self.old])
+
+    def test_post_resets_follower_lists(self):
+        """Пост автора с рассылкой сбрасывает списки подписчиков, не правя."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.follow_page()
+        key = feed_ids.ids_key(counters.FOLLOW, self.reader.pk)
+        self.assertIsNotNone(cache.get(key))
+        with mock.patch.object(feed_ids, '_edit') as edit:
+            post = Post.objects.create(author=self.author, text='Новый')
+        self.assertNotIn((counters.FOLLOW, self.reader.pk),
+                         edit.call_args[0][0])
+        self.assertIsNone(cache.get(key))
+        self.assertEqual(self.follow_page(), [post, self.old])
+
+    def test_popular_author_post_resets_follow_feeds(self):
+        """Пост автора без рассылки не правит кэш каждого подписчика."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        with mock.patch.object(timeline, 'TIMELINE_FANOUT_LIMIT', 1):
+            timeline.stop_fan_out(self.author.pk)
+        self.follow_page()
+        key = feed_ids.ids_key(counters.FOLLOW, self.reader.pk)
+        entry = cache.get(key)
+        post = Post.objects.create(author=self.author, text='Новый')
+        self.assertEqual(cache.get(key), entry)
+        self.assertNotEqual(
+            feed_ids.ids_key(counters.FOLLOW, self.reader.pk), key)
+        self.assertEqual(self.follow_page(), [post, self.old])
@@ -0,0 +1,27 @@
+from django.test import SimpleTestCase
+
+from ..models import Post
+from ..utils import ELLIPSIS, CursorPaginator
+
+
+class ElidedPageRangeTest(SimpleTestCase):
+    def get_range(self, count, number):
+        paginator = CursorPaginator(Post.objects.none(), 10)
+        paginator.count = count
+        return list(paginator.get_elided_page_range(number))
+
+    def test_short_range_is_not_elided(self):
+        """Короткая лента выводит все номера страниц."""
+        self.assertEqual(self.get_range(50, 1), [1, 2, 3, 4, 5])
+
+    def test_long_range_is_elided(self):
+        """Длинная лента выводит окно вокруг текущей страницы."""
+        cases = {
+            1: [1, 2, 3, ELLIPSIS, 50_000],
+            25_000: [1, ELLIPSIS, 24_998, 24_999, 25_000, 25_001, 25_002,
+                     ELLIPSIS, 50_000],
+            50_000: [1, ELLIPSIS, 49_998, 49_999, 50_000],
+        }
+        for number, expected in cases.items():
+            with self.subTest(number=number):
+                self.assertEqual(self.get_range(500_000, number), expected)
@@ -1,16 +1,22 @@
+import io
 import shutil
 import tempfile
 from http import HTTPStatus
+from unittest import mock
 
 from django import forms
 from django.conf import settings
 from django.contrib.auth.models import User
 from django.core.cache import cache
 from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from posts.constants import PAG_PAGE_NUM
+from posts import cards, comments
+from posts.constants import COMMENT_PREVIEW_NUM, PAG_PAGE_NUM
 from posts.models import Post, Group, Comment, Follow
 
 NUM_OF_POST: int = 13
@@ -137,6 +143,78 @@ class TaskPagesTests(TestCase):
                 self.assertEqual(count_posts2, NUM_OF_POST - PAG_PAGE_NUM,
                                  error_page2)
 
+    def test_cursor_pagination(self):
+        """Переходы по ?after=/?before= совпадают с номерными страницами."""
+        pages: tuple = (reverse('posts:index'),
+                        reverse('posts:profile',
+                                kwargs={'username': f'{self.post_author}'}),
+                        reverse('posts:group_list',
+                                kwargs={'slug': f'{self.group.slug}'}))
+        for page in pages:
+            with self.subTest(page=page):
+                first = self.authorized_author.get(page).context['page_obj']
+                second = self.authorized_author.get(
+                    page + '?after=' + first.next_cursor
+                ).context['page_obj']
+                self.assertEqual(len(second), NUM_OF_POST - PAG_PAGE_NUM)
+                self.assertFalse(second.has_next())
+                numbered = self.authorized_author.get(
+                    page + '?page=2').context['page_obj']
+                self.assertEqual(list(second), list(numbered))
+                back = self.authorized_author.get(
+                    page + '?before=' + second.previous_cursor
+                ).context['page_obj']
+                self.assertEqual(list(back), list(first))
+                self.assertFalse(back.has_previous())
+
+    def test_author_pages_without_count_queries(self):
+        """Профиль и пост выводят статистику автора без COUNT."""
+        profile = reverse('posts:profile',
+                          kwargs={'username': self.post_author})
+        pages = {
+            profile: f'Всего постов: {NUM_OF_POST}',
+            reverse('posts:post_detail', kwargs={'post_id': self.post.pk}):
+                f'Всего постов автора: {NUM_OF_POST}',
+        }
+        self.authorized_follower.get(profile)
+        for page, expected in pages.items():
+            with self.subTest(page=page):
+                with CaptureQueriesContext(connection) as queries:
+                    response = self.authorized_follower.get(page)
+                self.assertContains(response, expected)
+                self.assertFalse(any('COUNT(' in query['sql']
+                                     for query in queries.captured_queries))
+
+    def test_feed_comment_previews(self):
+        """Карточки ленты получают счётчик и превью без запросов на пост."""
+        self.authorized_follower.post(
+            reverse('posts:add_comment', kwargs={'post_id': self.post.pk}),
+            data={'text': 'Свежий коммент'})
+        self.authorized_author.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.authorized_author.get(reverse('posts:index'))
+        post = response.context['page_obj'][0]
+        self.assertEqual(post.comment_count, 2)
+        self.assertEqual(
+            [comment['text'] for comment in post.comment_preview],
+            ['Свежий коммент', self.comment.text])
+        self.assertContains(response, 'Комментариев: 2')
+        self.assertFalse(any('posts_comment' in query['sql']
+                             for query in queries.captured_queries))
+
+    def test_comment_previews_load_only_latest(self):
+        """Из БД читаются только COMMENT_PREVIEW_NUM комментариев поста."""
+        Comment.objects.bulk_create(
+            Comment(post=self.post, author=self.post_follower,
+                    text=f'Коммент {i}')
+            for i in range(COMMENT_PREVIEW_NUM + 3))
+        post = Post.objects.get(pk=self.post.pk)
+        with mock.patch.object(comments, 'comment_snapshot',
+                               wraps=comments.comment_snapshot) as snapshot:
+            comments.attach_comment_previews([post])
+        self.assertEqual(snapshot.call_count, COMMENT_PREVIEW_NUM)
+        self.assertEqual(len(post.comment_preview), COMMENT_PREVIEW_NUM)
+
     def test_post_index_show_correct_context(self):
         """Шаблон Index сформирован с правильным контекстом."""
         response = self.authorized_author.get(reverse('posts:index'))
@@ -211,6 +289,14 @@ class TaskPagesTests(TestCase):
                     response.context['form'].fields['text'],
                     forms.fields.CharField)
 
+    def test_post_detail_without_author(self):
+        """Пост без автора открывается, статистики автора нет."""
+        post = Post.objects.create(text='Пост без автора', group=self.group)
+        response = Client().get(
+            reverse('posts:post_detail', kwargs={'post_id': post.id}))
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertIsNone(response.context['author_stats'])
+
     def test_post_added_correctly(self):
         """Проверка создания поста с разными условиями."""
         post = Post.objects.create(
@@ -244,21 +330,83 @@ class TaskPagesTests(TestCase):
                          'поста нет в группе другого пользователя')
 
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
+        """Кэш ленты живёт до записи поста и различает страницы."""
         response = self.authorized_author.get(reverse('posts:index'))
         posts = response.content
+        Post.objects.filter(pk=self.post.pk).update(text='Мимо сигналов')
+        response_old = self.authorized_author.get(reverse('posts:index'))
+        self.assertEqual(response_old.content, posts)
+        response_page2 = self.authorized_author.get(
+            reverse('posts:index') + '?page=2')
+        self.assertNotEqual(response_page2.content, posts)
         Post.objects.create(
             text='test_new_post',
             author=self.post_author,
         )
-        response_old = self.authorized_author.get(reverse('posts:index'))
-        old_posts = response_old.content
-        cache.clear()
-        self.assertEqual(old_posts, posts)
-        cache.clear()
         response_new = self.authorized_author.get(reverse('posts:index'))
-        new_posts = response_new.content
-        self.assertNotEqual(old_posts, new_posts)
+        self.assertNotEqual(response_new.content, posts)
+        self.assertContains(response_new, 'test_new_post')
+
+    def test_post_cards_cached_by_version(self):
+        """Карточки берутся из кэша, пока пост не изменился."""
+        group_page = reverse('posts:group_list',
+                             kwargs={'slug': self.group.slug})
+        self.authorized_author.get(reverse('posts:index'))
+        misses = cards.stats['misses']
+        self.authorized_author.get(reverse('posts:follow_index'))
+        self.assertEqual(cards.stats['misses'], misses)
+        self.authorized_author.get(group_page)
+        self.assertEqual(cards.stats['misses'], misses + PAG_PAGE_NUM)
+        post = Post.objects.get(pk=self.post.pk)
+        version = post.version
+        post.text = 'Новая версия'
+        post.save()
+        self.assertEqual(post.version, version + 1)
+        response = self.authorized_follower.get(reverse('posts:follow_index'))
+        self.assertEqual(cards.stats['misses'], misses + PAG_PAGE_NUM + 1)
+        self.assertContains(response, 'Новая версия')
+
+    def test_cards_follow_author_and_group_rename(self):
+        """Переименование автора и группы перерисовывает карточки."""
+        self.authorized_author.get(reverse('posts:index'))
+        author = User.objects.get(pk=self.post_author.pk)
+        author.first_name = 'Переименованный'
+        author.save()
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        response = self.authorized_author.get(reverse('posts:index'))
+        self.assertContains(response, 'Переименованный')
+        self.assertContains(response, 'Новое название')
+
+    def test_cache_group_and_profile(self):
+        """Лента группы и профиля обновляется после правки поста."""
+        pages = (
+            reverse('posts:group_list', kwargs={'slug': self.group.slug}),
+            reverse('posts:profile', kwargs={'username': self.post_author}),
+        )
+        for page in pages:
+            self.authorized_author.get(page)
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Отредактированный пост'
+        post.save()
+        for page in pages:
+            with self.subTest(page=page):
+                response = self.authorized_author.get(page)
+                self.assertContains(response, 'Отредактированный пост')
+
+    def test_warm_caches(self):
+        """warm_caches кладёт в кэш страницы лент и миниатюры."""
+        out = io.StringIO()
+        call_command('warm_caches', '--pages=2', '--workers=1', stdout=out)
+        self.assertIn('thumb', out.getvalue())
+        urls = (reverse('posts:index'),
+                reverse('posts:index') + '?page=2',
+                reverse('posts:group_list', args=[self.group.slug]),
+                reverse('posts:profile', args=[self.post_author.username]))
+        for url in urls:
+            with self.subTest(url=url):
+                self.assertEqual(self.client.get(url)['X-Page-Cache'], 'hit')
 
 
 class FollowViewsTest(TestCase):
@@ -332,3 +480,56 @@ class FollowViewsTest(TestCase):
         response = self.author_client.get(
             reverse('posts:follow_index'))
         self.assertNotIn(self.post, response.context['page_obj'].object_list)
+
+
+class ConditionalGetTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = User.objects.create_user(username='author')
+        cls.group = Group.objects.create(title='Группа', slug='group')
+        cls.post = Post.objects.create(text='Пост', author=cls.author,
+                                       group=cls.group)
+        cls.pages = (
+            reverse('posts:index'),
+            reverse('posts:group_list', kwargs={'slug': cls.group.slug}),
+            reverse('posts:profile', kwargs={'username': cls.author}),
+            reverse('posts:post_detail', kwargs={'post_id': cls.post.pk}),
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.author_client = Client()
+        self.author_client.force_login(self.author)
+
+    def test_not_modified_without_rendering(self):
+        """Свежий ETag даёт 304 без рендера шаблонов и запросов к постам."""
+        for client in (self.client, self.author_client):
+            for page in self.pages:
+                with self.subTest(page=page):
+                    etag = client.get(page)['ETag']
+                    with CaptureQueriesContext(connection) as queries:
+                        response = client.get(page, HTTP_IF_NONE_MATCH=etag)
+                    self.assertEqual(response.status_code,
+                                     HTTPStatus.NOT_MODIFIED)
+                    self.assertEqual(response.templates, [])
+                    self.assertFalse(any(
+                        'posts_' in query['sql']
+                        for query in queries.captured_queries))
+
+    def test_last_modified(self):
+        """If-Modified-Since тоже даёт 304 для неизменной страницы."""
+        last_modified = self.client.get(self.pages[0])['Last-Modified']
+        response = self.client.get(self.pages[0],
+                                   HTTP_IF_MODIFIED_SINCE=last_modified)
+        self.assertEqual(response.status_code, HTTPStatus.NOT_MODIFIED)
+
+    def test_etag_changes_on_write_and_user(self):
+        """ETag меняется после записи и различается для пользователей."""
+        etag = self.client.get(self.pages[0])['ETag']
+        self.assertNotEqual(
+            self.author_client.get(self.pages[0])['ETag'], etag)
+        Comment.objects.create(post=self.post, author=self.author,
+                               text='Коммент')
+        response = self.client.get(self.pages[0], HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, HTTPStatus.OK)
+        self.assertNotEqual(response['ETag'], etag)
@@ -0,0 +1,143 @@
+"""Лента подписок, материализованная в таблице Timeline.
+
+Новый пост автора сразу записывается в Timeline каждого подписчика
+(fan-out on write) вместе с датой публикации, подписка дописывает туда
+TIMELINE_BACKFILL_LIMIT последних постов автора, отписка их
+вычёркивает. Список id ленты (FEED_IDS_LIMIT + 1 постов) читается по
+индексу (user, pub_date, post) без JOIN Follow и Post и без сортировки:
+в него попадают только последние посты каждого автора, а они все в
+Timeline. Более глубокие страницы читаются JOIN по Follow.
+
+Авторы, у которых TIMELINE_FANOUT_LIMIT подписчиков и больше, в ленты
+не рассылаются: одна запись не должна порождать миллионы строк. Их
+посты подмешиваются при чтении. Флаг AuthorStats.fan_out снимается при
+достижении порога и обратно сам не ставится, поэтому посты автора не
+теряются, если подписчиков снова стало меньше.
+"""
+import heapq
+from itertools import groupby, islice
+
+from .constants import (FEED_IDS_LIMIT, TIMELINE_BACKFILL_LIMIT,
+                        TIMELINE_BATCH_SIZE, TIMELINE_FANOUT_LIMIT)
+from .feed_ids import CURSOR_ORDERING, limit_ids
+from .models import AuthorStats, Follow, Post, Timeline
+
+
+def fans_out(author_id):
+    return not AuthorStats.objects.filter(
+        author_id=author_id, fan_out=False).exists()
+
+
+def _insert(entries):
+    entries = iter(entries)
+    while True:
+        batch = list(islice(entries, TIMELINE_BATCH_SIZE))
+        if not batch:
+            return
+        Timeline.objects.bulk_create(batch, ignore_conflicts=True)
+
+
+def fan_out(post, followers):
+    """Пишет новый пост в ленты подписчиков followers (id)."""
+    if post.author_id is not None and fans_out(post.author_id):
+        _insert(Timeline(user_id=user_id, post_id=post.pk,
+                         pub_date=post.pub_date)
+                for user_id in followers)
+
+
+def latest_posts(author_id):
+    return Post.objects.filter(author_id=author_id).order_by(
+        *CURSOR_ORDERING).values_list('pk', 'pub_date')
+
+
+def backfill(user_id, author_id):
+    """Новая подписка: последние посты автора — в ленту читателя."""
+    if fans_out(author_id):
+        posts = latest_posts(author_id)[:TIMELINE_BACKFILL_LIMIT]
+        _insert(Timeline(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for pk, pub_date in posts)
+
+
+def refill(author_id, exclude=None):
+    """Пост автора ушёл: у подписчиков снова все его последние посты.
+
+    У каждого подписчика в Timeline непрерывный ряд последних постов
+    автора длиной не меньше TIMELINE_BACKFILL_LIMIT, без поста ряд
+    дополняется следующим по дате.
+    """
+    if author_id is None or not fans_out(author_id):
+        return
+    posts = latest_posts(author_id).exclude(pk=exclude)[
+        TIMELINE_BACKFILL_LIMIT - 1:TIMELINE_BACKFILL_LIMIT]
+    for pk, pub_date in posts:
+        _insert(Timeline(user_id=user_id, post_id=pk, pub_date=pub_date)
+                for user_id in Follow.objects.filter(
+                    author_id=author_id).values_list('user_id', flat=True))
+
+
+def trim(user_id, author_id):
+    """Отписка: посты автора уходят из ленты читателя."""
+    Timeline.objects.filter(
+        user_id=user_id, post__author_id=author_id).delete()
+
+
+def move(post):
+    """Автор поста сменился: пост переезжает в ленты новых подписчиков."""
+    Timeline.objects.filter(post=post).delete()
+    fan_out(post, Follow.objects.filter(
+        author_id=post.author_id).values_list('user_id', flat=True))
+
+
+def rebuild():
+    """Заполняет Timeline заново по подпискам; возвращает число подписок."""
+    Timeline.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    count = 0
+    for user_id, author_id in follows.iterator():
+        backfill(user_id, author_id)
+        count += 1
+    return count
+
+
+def stop_fan_out(author_id):
+    """Автор набрал TIMELINE_FANOUT_LIMIT подписчиков: дальше без рассылки."""
+    if AuthorStats.objects.filter(
+            author_id=author_id, fan_out=True,
+            followers__gte=TIMELINE_FANOUT_LIMIT).update(fan_out=False):
+        AuthorStats.objects.invalidate(author_id)
+
+
+def merged_authors(user):
+    return Follow.objects.filter(
+        user=user, author__stats__fan_out=False).values_list(
+            'author_id', flat=True)
+
+
+def follow_feed(user):
+    """Посты ленты подписок user для страниц глубже списка id."""
+    return Post.objects.filter(author__following__user=user)
+
+
+def timeline_ids(user, *fields):
+    """Поля записей Timeline от новых постов к старым, по индексу."""
+    return Timeline.objects.filter(user=user).order_by(
+        '-pub_date', '-post_id').values_list(*fields)[:FEED_IDS_LIMIT + 1]
+
+
+def merged_ids(authors):
+    return Post.objects.filter(author_id__in=authors).order_by(
+        *CURSOR_ORDERING).values_list('pub_date', 'pk')[:FEED_IDS_LIMIT + 1]
+
+
+def id_loader(user):
+    """load для feed_ids: Timeline, слитый с постами авторов без рассылки."""
+    def load(queryset):
+        authors = list(merged_authors(user))
+        if not authors:
+            # Без слияния даты не нужны: их разбор дороже самого запроса.
+            return limit_ids(pk for pk, in timeline_ids(user, 'post_id'))
+        merged = heapq.merge(timeline_ids(user, 'pub_date', 'post_id'),
+                             merged_ids(authors), reverse=True)
+        # Пост мог попасть в Timeline до того, как автор вышел за порог.
+        return limit_ids(pk for (_, pk), _ in groupby(merged))
+    return load
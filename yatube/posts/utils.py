@@ -1,8 +1,202 @@
-from django.core.paginator import Paginator
+import base64
+from datetime import datetime
 
+from django.core.paginator import Page, Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
 
-def do_paginate(request, paginate_data, page_nums):
-    paginator = Paginator(paginate_data, page_nums)
+from . import counters, feed_ids
+from .constants import PAG_ON_EACH_SIDE, PAG_ON_ENDS
+from .feed_ids import CURSOR_ORDERING
+from .read_models import PostQuerySet
+
+ELLIPSIS = '…'
+
+
+def encode_cursor(post):
+    """Непрозрачный токен позиции поста в ленте: (pub_date, id)."""
+    raw = f'{post.pub_date.isoformat()}|{post.pk}'.encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(token):
+    """Возвращает (pub_date, id) или None для битого токена."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        raw = base64.urlsafe_b64decode(padded.encode()).decode()
+        pub_date, pk = raw.split('|')
+        return datetime.fromisoformat(pub_date), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+class CursorPage(Page):
+    """Страница ленты, полученная по курсору без OFFSET и COUNT."""
+
+    def __init__(self, object_list, paginator, has_next, has_previous):
+        super().__init__(object_list, None, paginator)
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self):
+        return '<Cursor page>'
+
+    def has_next(self):
+        return self._has_next
+
+    def has_previous(self):
+        return self._has_previous
+
+
+class CursorPaginator(Paginator):
+    """Paginator с поддержкой keyset-навигации по (pub_date, id).
+
+    Номерные страницы (?page=N) работают как у обычного Paginator,
+    переходы «вперёд/назад» идут по токенам ?after=/?before=. Если
+    передан кэшированный список id ленты (complete, ids), страницы в его
+    пределах достаются одним in_bulk без OFFSET. rows(queryset) задаёт,
+    в каком виде выбирать посты страницы; COUNT и id считаются по
+    исходному queryset без лишних JOIN.
+    """
+
+    ELLIPSIS = ELLIPSIS
+
+    def __init__(self, object_list, per_page, counter=None, ids=None,
+                 rows=None, **kwargs):
+        super().__init__(object_list.order_by(*CURSOR_ORDERING),
+                         per_page, **kwargs)
+        self.counter = counter
+        self.rows = rows or (lambda queryset: queryset)
+        self.complete, self.ids = ids if ids is not None else (False, None)
+
+    @cached_property
+    def count(self):
+        if self.complete:
+            return len(self.ids)
+        if self.counter is None:
+            return super().count
+        return self.counter(self.object_list)
+
+    def covers(self, stop):
+        """Срез [:stop] ленты целиком есть в списке id."""
+        return self.ids is not None and (self.complete
+                                         or stop <= len(self.ids))
+
+    def hydrate(self, ids):
+        posts = self.rows(self.object_list).in_bulk(ids)
+        return [posts[pk] for pk in ids if pk in posts]
+
+    def page(self, number):
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        top = bottom + self.per_page
+        if self.covers(top):
+            posts = self.hydrate(self.ids[bottom:top])
+        else:
+            posts = list(self.rows(self.object_list)[bottom:top])
+        return self._get_page(posts, number, self)
+
+    def get_page(self, number):
+        page = super().get_page(number)
+        page.page_window = list(self.get_elided_page_range(page.number))
+        self.set_cursors(page)
+        return page
+
+    def get_elided_page_range(self, number, on_each_side=PAG_ON_EACH_SIDE,
+                              on_ends=PAG_ON_ENDS):
+        """Номера страниц вокруг текущей, первые и последние.
+
+        Пропуски обозначаются ELLIPSIS, поэтому число ссылок не зависит
+        от количества постов в ленте.
+        """
+        num_pages = self.num_pages
+        if num_pages <= (on_each_side + on_ends) * 2:
+            yield from range(1, num_pages + 1)
+            return
+        if number > 1 + on_each_side + on_ends + 1:
+            yield from range(1, on_ends + 1)
+            yield ELLIPSIS
+            yield from range(number - on_each_side, number + 1)
+        else:
+            yield from range(1, number + 1)
+        if number < num_pages - on_each_side - on_ends - 1:
+            yield from range(number + 1, number + on_each_side + 1)
+            yield ELLIPSIS
+            yield from range(num_pages - on_ends + 1, num_pages + 1)
+        else:
+            yield from range(number + 1, num_pages + 1)
+
+    def get_cursor_page(self, after=None, before=None):
+        page = self.get_cached_cursor_page(after, before)
+        if page is not None:
+            return page
+        if after is not None:
+            pub_date, pk = after
+            rows = list(self.rows(self.object_list.filter(
+                Q(pub_date__lt=pub_date) | Q(pub_date=pub_date, pk__lt=pk)
+            ))[:self.per_page + 1])
+            has_next = len(rows) > self.per_page
+            page = CursorPage(rows[:self.per_page], self, has_next, True)
+        else:
+            pub_date, pk = before
+            rows = list(self.rows(self.object_list.filter(
+                Q(pub_date__gt=pub_date) | Q(pub_date=pub_date, pk__gt=pk)
+            )).reverse()[:self.per_page + 1])
+            has_previous = len(rows) > self.per_page
+            rows = rows[:self.per_page][::-1]
+            page = CursorPage(rows, self, True, has_previous)
+        self.set_cursors(page)
+        return page
+
+    def get_cached_cursor_page(self, after, before):
+        """Страница по курсору из списка id или None, если его мало."""
+        _, pk = after or before
+        if self.ids is None or pk not in self.ids:
+            return None
+        index = self.ids.index(pk)
+        if after is not None:
+            stop = index + 1 + self.per_page
+            if not self.covers(stop + 1):
+                return None
+            has_next = len(self.ids) > stop
+            page = CursorPage(self.hydrate(self.ids[index + 1:stop]), self,
+                              has_next, True)
+        else:
+            start = max(0, index - self.per_page)
+            page = CursorPage(self.hydrate(self.ids[start:index]), self,
+                              True, start > 0)
+        self.set_cursors(page)
+        return page
+
+    @staticmethod
+    def set_cursors(page):
+        posts = list(page)
+        page.next_cursor = (
+            encode_cursor(posts[-1]) if posts and page.has_next() else None)
+        page.previous_cursor = (
+            encode_cursor(posts[0]) if posts and page.has_previous()
+            else None)
+
+
+def do_paginate(request, paginate_data, page_nums, feed=None,
+                load_ids=feed_ids.load_ids):
+    """Страница ленты из PostRow для карточек.
+
+    feed=(feed, value) включает кэш COUNT и списка id ленты, load_ids
+    собирает этот список при промахе кэша.
+    """
+    counter = ids = None
+    if feed is not None:
+        counter = counters.FeedCounter(*feed)
+        ids = feed_ids.feed_ids(*feed, paginate_data, load_ids)
+    paginator = CursorPaginator(paginate_data, page_nums, counter, ids,
+                                rows=PostQuerySet.feed_rows)
+    after = decode_cursor(request.GET.get('after', ''))
+    before = decode_cursor(request.GET.get('before', ''))
+    if after or before:
+        page_obj = paginator.get_cursor_page(after=after, before=before)
+        if len(page_obj):
+            return page_obj
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     return page_obj
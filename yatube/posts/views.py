@@ -1,29 +1,49 @@
+from django.conf import settings
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 from django.http import HttpResponseNotFound
 from django.shortcuts import render, get_object_or_404, redirect
 
+from core.page_cache import conditional_page
+from core.views import known_not_found
+
+from . import counters, known_names, recent_posts, timeline
+from .fragments import FeedFragment
+from .comments import attach_comment_previews
 from .constants import PAG_PAGE_NUM
 from .forms import PostForm, CommentForm
-from .models import Post, Group, User, Follow
+from .holes import is_following
+from .models import AuthorStats, Post, Group, User, Follow, user_rows
+from .row_cache import cached_or_404
 from .utils import do_paginate
 
 
+@conditional_page
 def index(request):
     post_model_data = Post.objects.all()
-    page_obj = do_paginate(request, post_model_data, PAG_PAGE_NUM)
+    page_obj = do_paginate(request, post_model_data, PAG_PAGE_NUM,
+                           (counters.INDEX, None))
+    attach_comment_previews(page_obj)
     context = {
         'page_obj': page_obj,
+        'feed_cache': FeedFragment(request, counters.INDEX),
     }
     return render(request, 'posts/index.html', context)
 
 
+@conditional_page
 def group_posts(request, slug):
-    group = get_object_or_404(Group, slug=slug)
+    if not known_names.group_slugs.might_exist(slug):
+        return known_not_found(request)
+    group = cached_or_404(Group.objects, slug=slug)
     post_model_data = group.posts.all()
-    page_obj = do_paginate(request, post_model_data, PAG_PAGE_NUM)
+    page_obj = do_paginate(request, post_model_data, PAG_PAGE_NUM,
+                           (counters.GROUP, group.pk))
+    attach_comment_previews(page_obj)
     context = {
         'group': group,
         'page_obj': page_obj,
+        'feed_cache': FeedFragment(request, counters.GROUP, group.pk),
     }
     return render(request, 'posts/group_list.html', context)
 
@@ -32,27 +52,37 @@ def pagenotfound(request, exception):
     return HttpResponseNotFound('<h1>Страница не найдена.</h1>')
 
 
+@conditional_page
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
+    if not known_names.usernames.might_exist(username):
+        return known_not_found(request)
+    author = cached_or_404(user_rows, username=username)
     all_author_posts = author.posts.all()
-    page_obj = do_paginate(request, all_author_posts, PAG_PAGE_NUM)
-    following = request.user.is_authenticated
-    if following:
-        following = author.following.filter(user=request.user).exists()
+    page_obj = do_paginate(request, all_author_posts, PAG_PAGE_NUM,
+                           (counters.AUTHOR, author.pk))
+    attach_comment_previews(page_obj)
     context = {
         'page_obj': page_obj,
         'author': author,
-        'following': following
+        'stats': AuthorStats.objects.for_author(author),
+        'following': is_following(request, author.pk),
+        'feed_cache': FeedFragment(request, counters.AUTHOR, author.pk),
     }
     return render(request, 'posts/profile.html', context)
 
 
+@conditional_page
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
+    post = cached_or_404(Post.objects, pk=post_id)
+    if post.author_id:
+        post.author = user_rows.cached(pk=post.author_id)
+    if post.group_id:
+        post.group = Group.objects.cached(pk=post.group_id)
     form = CommentForm()
-    comments = post.comments.all()
+    comments = post.comments.for_detail()
     context = {
         'post': post,
+        'author_stats': AuthorStats.objects.for_author(post.author),
         'form': form,
         'comments': comments,
     }
@@ -60,6 +90,7 @@ def post_detail(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def post_create(request):
     form = PostForm(
         request.POST or None,
@@ -97,6 +128,7 @@ def post_edit(request, post_id):
 
 
 @login_required
+@transaction.atomic
 def add_comment(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     template_name = 'posts/post_detail.html'
@@ -113,13 +145,22 @@ def add_comment(request, post_id):
 
 @login_required
 def follow_index(request):
-    posts = Post.objects.filter(author__following__user=request.user)
-    page_obj = do_paginate(request, posts, PAG_PAGE_NUM)
+    if settings.FOLLOW_FEED_ENGINE == 'recent_posts':
+        posts = Post.objects.filter(author__following__user=request.user)
+        load_ids = recent_posts.id_loader(request.user)
+    else:
+        posts = timeline.follow_feed(request.user)
+        load_ids = timeline.id_loader(request.user)
+    page_obj = do_paginate(
+        request, posts, PAG_PAGE_NUM,
+        (counters.FOLLOW, request.user.pk), load_ids)
+    attach_comment_previews(page_obj)
     context = {'page_obj': page_obj}
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@transaction.atomic
 def profile_follow(request, username):
     author = get_object_or_404(User, username=username)
     if author != request.user:
@@ -128,6 +169,7 @@ def profile_follow(request, username):
 
 
 @login_required
+@transaction.atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(author__username=username,
                           user=request.user).delete()
@@ -1,4 +1,9 @@
+import atexit
+import hashlib
 import os
+import shutil
+import sys
+import tempfile
 
 BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 
@@ -35,7 +40,9 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-
+    'core.middleware.IdentityMapMiddleware',
+    'core.middleware.LoadSheddingMiddleware',
+    'core.middleware.PageCacheMiddleware',
 ]
 
 ROOT_URLCONF = 'yatube.urls'
@@ -116,8 +123,61 @@ MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Источник списка id ленты подписок: 'timeline' — таблица Timeline,
+# 'recent_posts' — буферы последних постов авторов в памяти процесса.
+# Сигналы ведут только выбранный источник: при возврате к 'timeline'
+# таблицу нужно заполнить заново (manage.py rebuild_timelines).
+FOLLOW_FEED_ENGINE = 'timeline'
+
+# Файлы build_suggestions: снимок подписок и рекомендации авторов.
+SUGGESTIONS_ROOT = os.path.join(BASE_DIR, 'suggestions')
+
+# Тесты чистят кэш в setUp: у каждого прогона свой файл кэша, чтобы
+# не стирать кэш dev-сервера и не мешать параллельным прогонам.
+TESTING = sys.argv[1:2] == ['test'] or 'pytest' in sys.modules
+if TESTING:
+    CACHE_DIR = tempfile.mkdtemp(prefix='yatube-cache-')
+    atexit.register(shutil.rmtree, CACHE_DIR, True)
+else:
+    CACHE_DIR = BASE_DIR
+CACHE_FILE = os.path.join(CACHE_DIR, 'cache.sqlite3')
+
+
+def source_release(root):
+    """Хэш кода и шаблонов проекта.
+
+    Файл кэша переживает перезапуск, а в нём HTML и pickle моделей:
+    после выкладки новой версии ключи должны стать другими.
+    """
+    digest = hashlib.md5()
+    for path, dirs, files in os.walk(root):
+        dirs[:] = sorted(d for d in dirs if d not in ('media', 'suggestions'))
+        for name in sorted(files):
+            if name.endswith(('.py', '.html')):
+                with open(os.path.join(path, name), 'rb') as source:
+                    digest.update(source.read())
+    return digest.hexdigest()[:12]
+
+
+CACHE_RELEASE = source_release(BASE_DIR)
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'BACKEND': 'core.cache_backends.TwoTierCache',
+        'LOCATION': 'shared',
+        'KEY_PREFIX': CACHE_RELEASE,
+        'OPTIONS': {
+            'CHANNEL': CACHE_FILE,
+            'L1_MAX_ENTRIES': 1000,
+            'L1_TIMEOUT': 5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache_backends.SQLiteCache',
+        'LOCATION': CACHE_FILE,
+        'KEY_PREFIX': CACHE_RELEASE,
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
     }
 }